@@ -0,0 +1,207 @@
+""" Asynchronous, connection-pooled HTTP fetching shared by the scrapers """
+import asyncio
+import codecs
+import concurrent.futures
+import contextvars
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from metrics import metrics
+
+if TYPE_CHECKING:
+    import aiohttp
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Bodies are read and decoded in chunks of this size, so no more than one is held as bytes
+CHUNK_BYTES = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FetchResult:
+    """Outcome of a single HTTP request. Header names are lowercased.
+
+    ``truncated`` is set when only the start of the body was read on purpose.
+    """
+    url: str
+    status: int = 0
+    text: str = ""
+    headers: Dict[str, str] = field(default_factory=dict)
+    error: Optional[str] = None
+    truncated: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and 200 <= self.status < 300
+
+
+class AsyncFetcher:
+    """Fetches pages over a single keep-alive aiohttp session.
+
+    The session lives on a private event loop running in a daemon thread, so
+    synchronous callers can use ``run`` while coroutines scheduled through it
+    share the same connection pool. ``max_connections`` caps in-flight requests
+    globally and ``max_per_host`` caps them per host.
+    """
+
+    def __init__(self, max_connections: int = 64, max_per_host: int = 4, timeout: float = 30,
+                 headers: Optional[Dict[str, str]] = None):
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.headers = headers or DEFAULT_HEADERS
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Optional['aiohttp.ClientSession'] = None
+        self._lock = threading.Lock()
+
+    def run(self, coro):
+        """Run a coroutine on the fetcher's loop and block until it finishes."""
+        return self.submit(coro).result()
+
+    def submit(self, coro) -> concurrent.futures.Future:
+        """Schedule a coroutine on the fetcher's loop without waiting for it."""
+        loop = self._ensure_loop()
+        if self._thread is threading.current_thread():
+            coro.close()
+            raise RuntimeError("AsyncFetcher.run() cannot be called from its own event loop; await the coroutine instead")
+        # Carry the caller's context (e.g. metric labels) onto the loop
+        return asyncio.run_coroutine_threadsafe(_in_context(contextvars.copy_context(), coro), loop)
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="AsyncFetcher", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    async def _get_session(self) -> 'aiohttp.ClientSession':
+        if self._session is None or self._session.closed:
+            # aiohttp is imported on first request to keep startup fast
+            import aiohttp
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_per_host,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None, max_bytes: Optional[int] = None,
+                    partial_bytes: Optional[int] = None, content_types: Optional[Tuple[str, ...]] = None) -> FetchResult:
+        """GET a URL, returning a FetchResult instead of raising on failure.
+
+        The body is streamed and decoded incrementally. A body over ``max_bytes``
+        or a Content-Type not starting with one of ``content_types`` is abandoned
+        as an error, while ``partial_bytes`` stops reading early without one.
+        """
+        import aiohttp
+        session = await self._get_session()
+        start = time.perf_counter()
+        try:
+            async with session.get(url, headers=headers) as response:
+                response_headers = {key.lower(): value for key, value in response.headers.items()}
+                result = FetchResult(url=url, status=response.status, headers=response_headers)
+                content_type = response.content_type.lower() if 'content-type' in response_headers else ''
+                if content_types and content_type and not content_type.startswith(content_types):
+                    result.error = f"unexpected content type {content_type}"
+                    metrics.inc('fetch_aborted_total', reason='content_type')
+                elif max_bytes and not partial_bytes and (response.content_length or 0) > max_bytes:
+                    result.error = f"body of {response.content_length} bytes is over the {max_bytes} byte limit"
+                    metrics.inc('fetch_aborted_total', reason='too_large')
+                else:
+                    await self._read_body(response, result, max_bytes, partial_bytes)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            result = FetchResult(url=url, error=str(e) or type(e).__name__)
+        metrics.observe('fetch_seconds', time.perf_counter() - start)
+        metrics.inc('fetch_requests_total', status=str(result.status) if result.error is None else 'error')
+        return result
+
+    async def probe(self, url: str, timeout: Optional[float] = None) -> FetchResult:
+        """Check whether a URL serves a page without downloading it.
+
+        Sends a HEAD request, or a one-byte ranged GET where HEAD isn't
+        allowed, following redirects; the result's ``url`` is where they end.
+        """
+        import aiohttp
+        session = await self._get_session()
+        request_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+        start = time.perf_counter()
+        try:
+            async with session.head(url, allow_redirects=True, timeout=request_timeout) as response:
+                status, final_url, response_headers = response.status, str(response.url), response.headers
+            if status in (405, 501):
+                async with session.get(url, headers={'Range': 'bytes=0-0'}, timeout=request_timeout) as response:
+                    status, final_url, response_headers = response.status, str(response.url), response.headers
+            result = FetchResult(url=final_url, status=status,
+                                 headers={key.lower(): value for key, value in response_headers.items()})
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            result = FetchResult(url=url, error=str(e) or type(e).__name__)
+        metrics.observe('fetch_seconds', time.perf_counter() - start)
+        metrics.inc('fetch_requests_total', status=str(result.status) if result.error is None else 'error')
+        return result
+
+    @staticmethod
+    async def _read_body(response: 'aiohttp.ClientResponse', result: FetchResult, max_bytes: Optional[int],
+                         partial_bytes: Optional[int]):
+        """Stream the body into ``result.text``, stopping at ``partial_bytes`` or failing past ``max_bytes``."""
+        try:
+            decoder = codecs.getincrementaldecoder(response.charset or 'utf-8')(errors='replace')
+        except LookupError:
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        pieces, size = [], 0
+        async for chunk in response.content.iter_chunked(CHUNK_BYTES):
+            if partial_bytes and size + len(chunk) >= partial_bytes:
+                chunk = chunk[:partial_bytes - size]
+                result.truncated = True
+            size += len(chunk)
+            if max_bytes and size > max_bytes:
+                result.error = f"body is over the {max_bytes} byte limit"
+                metrics.inc('fetch_aborted_total', reason='too_large')
+                break
+            pieces.append(decoder.decode(chunk))
+            if result.truncated:
+                break
+        metrics.inc('fetch_bytes_total', size)
+        if result.error is None:
+            pieces.append(decoder.decode(b'', final=True))
+            result.text = ''.join(pieces)
+
+    async def fetch_many(self, urls: Iterable[str]) -> List[FetchResult]:
+        """Fetch several URLs concurrently, preserving input order."""
+        return await asyncio.gather(*(self.fetch(url) for url in urls))
+
+    async def _close_session(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def close(self):
+        """Close the session and stop the background loop."""
+        if self._loop is None:
+            return
+        self.run(self._close_session())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+        self._thread = None
+        self._session = None
+
+
+async def _in_context(context: contextvars.Context, coro):
+    """Await ``coro`` with the context variables captured from another thread."""
+    for variable, value in context.items():
+        variable.set(value)
+    return await coro
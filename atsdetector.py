@@ -0,0 +1,157 @@
+""" Detects hosted applicant-tracking boards and reads their postings from JSON feeds """
+import html
+import json
+import logging
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from asyncfetcher import AsyncFetcher
+from htmlreducer import html_to_text
+from jobad import JobAd
+
+logger = logging.getLogger(__name__)
+
+# Patterns are tried in order; the first capture group is the board token
+ATS_PATTERNS = {
+    'greenhouse': [
+        re.compile(r'boards\.greenhouse\.io/embed/job_board(?:/js)?\?for=([\w-]+)', re.IGNORECASE),
+        re.compile(r'boards-api\.greenhouse\.io/v1/boards/([\w-]+)', re.IGNORECASE),
+        re.compile(r'(?:job-)?boards(?:\.eu)?\.greenhouse\.io/(?!embed\b)([\w-]+)', re.IGNORECASE),
+    ],
+    'lever': [
+        re.compile(r'api\.lever\.co/v0/postings/([\w.-]+)', re.IGNORECASE),
+        re.compile(r'jobs\.(?:eu\.)?lever\.co/([\w.-]+)', re.IGNORECASE),
+    ],
+    'workable': [
+        re.compile(r'apply\.workable\.com/api/v1/widget/accounts/([\w-]+)', re.IGNORECASE),
+        re.compile(r'apply\.workable\.com/(?!api\b|j\b)([\w-]+)', re.IGNORECASE),
+        re.compile(r'//(?!apply\.|www\.)([\w-]+)\.workable\.com', re.IGNORECASE),
+    ],
+    'ashby': [
+        re.compile(r'api\.ashbyhq\.com/posting-api/job-board/([\w.%-]+)', re.IGNORECASE),
+        re.compile(r'jobs\.ashbyhq\.com/([\w.%-]+)', re.IGNORECASE),
+    ],
+}
+
+DEFAULT_FEED_BASES = {
+    'greenhouse': 'https://boards-api.greenhouse.io',
+    'lever': 'https://api.lever.co',
+    'workable': 'https://apply.workable.com',
+    'ashby': 'https://api.ashbyhq.com',
+}
+
+FEED_PATHS = {
+    'greenhouse': '/v1/boards/{token}/jobs?content=true',
+    'lever': '/v0/postings/{token}?mode=json',
+    'workable': '/api/v1/widget/accounts/{token}?details=true',
+    'ashby': '/posting-api/job-board/{token}?includeCompensation=true',
+}
+
+
+@dataclass
+class ATSBoard:
+    provider: str
+    token: str
+
+
+def detect_ats(html_content: str) -> Optional[ATSBoard]:
+    """Find the first known ATS board embedded or linked in a page."""
+    for provider, patterns in ATS_PATTERNS.items():
+        for pattern in patterns:
+            match = pattern.search(html_content)
+            if match:
+                return ATSBoard(provider, match.group(1))
+    return None
+
+
+class ATSClient:
+    """Fetches every posting on an ATS board in one request and maps them to JobAds.
+
+    ``feed_bases`` overrides the API origin per provider, e.g. to point at a
+    local stand-in server.
+    """
+
+    def __init__(self, fetcher: AsyncFetcher, feed_bases: Optional[Dict[str, str]] = None):
+        self.fetcher = fetcher
+        self.feed_bases = {**DEFAULT_FEED_BASES, **(feed_bases or {})}
+
+    def feed_url(self, board: ATSBoard) -> str:
+        return self.feed_bases[board.provider].rstrip('/') + FEED_PATHS[board.provider].format(token=board.token)
+
+    async def fetch_job_ads(self, board: ATSBoard, company: str) -> List[JobAd]:
+        url = self.feed_url(board)
+        result = await self.fetcher.fetch(url, headers={'Accept': 'application/json'})
+        if not result.ok:
+            logger.warning(f"⚠️ Could not read {board.provider} feed {url}: {result.error or result.status}")
+            return []
+        try:
+            payload = json.loads(result.text)
+            return getattr(self, f"_map_{board.provider}")(payload, company)
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            logger.warning(f"⚠️ Unexpected {board.provider} feed format from {url}: {e}")
+            return []
+
+    @staticmethod
+    def _map_greenhouse(payload: dict, company: str) -> List[JobAd]:
+        return [
+            JobAd(
+                url=job['absolute_url'],
+                title=job.get('title', ''),
+                # Greenhouse returns the description as escaped HTML
+                description=html_to_text(html.unescape(job.get('content') or '')),
+                company=company,
+                location=(job.get('location') or {}).get('name'),
+            )
+            for job in payload.get('jobs', [])
+        ]
+
+    @staticmethod
+    def _map_lever(payload: list, company: str) -> List[JobAd]:
+        job_ads = []
+        for job in payload:
+            salary = job.get('salaryRange') or {}
+            job_ads.append(JobAd(
+                url=job['hostedUrl'],
+                title=job.get('text', ''),
+                description=' '.join(filter(None, [job.get('descriptionPlain'), job.get('additionalPlain')])).strip(),
+                company=company,
+                location=(job.get('categories') or {}).get('location'),
+                salary=_format_range(salary.get('min'), salary.get('max'), salary.get('currency'), salary.get('interval')),
+            ))
+        return job_ads
+
+    @staticmethod
+    def _map_workable(payload: dict, company: str) -> List[JobAd]:
+        return [
+            JobAd(
+                url=job.get('url') or job['shortlink'],
+                title=job.get('title', ''),
+                description=html_to_text(job.get('description') or ''),
+                company=company,
+                location=', '.join(filter(None, [job.get('city'), job.get('state'), job.get('country')])) or None,
+            )
+            for job in payload.get('jobs', [])
+        ]
+
+    @staticmethod
+    def _map_ashby(payload: dict, company: str) -> List[JobAd]:
+        return [
+            JobAd(
+                url=job['jobUrl'],
+                title=job.get('title', ''),
+                description=job.get('descriptionPlain') or html_to_text(job.get('descriptionHtml') or ''),
+                company=company,
+                location=job.get('location'),
+                salary=(job.get('compensation') or {}).get('compensationTierSummary'),
+            )
+            for job in payload.get('jobs', [])
+            if job.get('isListed', True)
+        ]
+
+
+def _format_range(low, high, currency=None, interval=None) -> Optional[str]:
+    if low is None and high is None:
+        return None
+    amount = '-'.join(str(value) for value in (low, high) if value is not None)
+    return ' '.join(filter(None, [currency, amount, interval]))
@@ -0,0 +1,104 @@
+""" Extracts several job listings per chat completion """
+import asyncio
+import json
+import logging
+from typing import Dict, Optional
+
+from htmlreducer import estimate_tokens
+from llmclient import LLMClient
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('title', 'description', 'location', 'salary')
+
+SYSTEM_PROMPT = "You extract structured job information from job listing pages and reply with JSON only."
+
+INSTRUCTIONS = """
+Each job listing below starts with a line of the form "### LISTING <id>".
+For every listing, extract the job title, the full job description, the location and the salary.
+
+Reply with a JSON object of this exact shape, with one entry per listing:
+{"jobs": [{"id": "<id>", "title": "...", "description": "...", "location": "...", "salary": "..."}]}
+
+Use an empty string for any field you cannot find. Do not skip listings.
+"""
+
+
+class BatchExtractor:
+    """Packs reduced listing texts into token-budgeted batches, one request per batch.
+
+    Callers add listings to a batch while ``fits`` allows, so batches can be
+    sent as listings arrive. Replies are matched back to listings by ID. If a
+    reply is malformed or leaves listings out, the missing listings are split
+    in half and retried, down to single-listing requests.
+    """
+
+    def __init__(self, llm: LLMClient, max_batch_tokens: int = 8000, max_batch_listings: int = 8):
+        self.llm = llm
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_listings = max_batch_listings
+        self.overhead_tokens = estimate_tokens(SYSTEM_PROMPT + INSTRUCTIONS)
+
+    def fits(self, batch: Dict[str, str], text: str) -> bool:
+        """Whether a listing can join the batch within the listing and token budgets; an empty batch takes anything."""
+        if not batch:
+            return True
+        tokens = self.overhead_tokens + sum(map(estimate_tokens, batch.values())) + estimate_tokens(text)
+        return len(batch) < self.max_batch_listings and tokens <= self.max_batch_tokens
+
+    def is_full(self, batch: Dict[str, str]) -> bool:
+        return len(batch) >= self.max_batch_listings
+
+    async def extract(self, batch: Dict[str, str]) -> Dict[str, Optional[dict]]:
+        """Return job info for every listing ID in the batch; info is None if extraction failed."""
+        logger.info(f"📦 Extracting {len(batch)} listings in one batched request")
+        return await self._extract_batch(batch)
+
+    async def _extract_batch(self, batch: Dict[str, str]) -> Dict[str, Optional[dict]]:
+        try:
+            response = await self.llm.achat(
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": self._prompt(batch)},
+                ],
+                response_format={"type": "json_object"},
+            )
+            results = self._parse(response, batch)
+        except Exception as e:
+            logger.warning(f"⚠️ Batched extraction of {len(batch)} listings failed: {e}")
+            results = {}
+
+        missing = [listing_id for listing_id in batch if listing_id not in results]
+        if not missing:
+            return results
+        if len(batch) == 1:
+            return {missing[0]: None}
+
+        # Retry whatever the reply left out on smaller batches
+        logger.info(f"✂️ Reply covered {len(results)}/{len(batch)} listings, retrying {len(missing)} in smaller batches")
+        half = max(1, len(missing) // 2)
+        pieces = [missing[:half], missing[half:]] if len(missing) > 1 else [missing]
+        for retried in await asyncio.gather(*(self._extract_batch({i: batch[i] for i in piece}) for piece in pieces if piece)):
+            results.update(retried)
+        return results
+
+    @staticmethod
+    def _prompt(batch: Dict[str, str]) -> str:
+        listings = "\n\n".join(f"### LISTING {listing_id}\n{text}" for listing_id, text in batch.items())
+        return f"{INSTRUCTIONS}\n{listings}"
+
+    @staticmethod
+    def _parse(response: str, batch: Dict[str, str]) -> Dict[str, dict]:
+        """Return job info for every well-formed entry whose ID belongs to the batch."""
+        try:
+            jobs = json.loads(response).get('jobs')
+        except (ValueError, AttributeError):
+            return {}
+        if not isinstance(jobs, list):
+            return {}
+        results = {}
+        for job in jobs:
+            if not isinstance(job, dict) or str(job.get('id')) not in batch:
+                continue
+            results[str(job['id'])] = {field: str(job.get(field) or '') for field in FIELDS}
+        return results
@@ -0,0 +1,358 @@
+""" Crawls many companies in parallel, resumable from a checkpoint file or a shared work queue """
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from crawlstate import DEFAULT_STATE_PATH, CrawlState
+from jobad import JobAd
+from jobcrawler import JobCrawler
+from jobstore import JobStore
+from metrics import metrics
+from workqueue import Task, WorkQueue, default_owner
+
+logger = logging.getLogger(__name__)
+
+# Companies with these statuses are skipped on resume; errored ones are retried
+FINISHED_STATUSES = {'done', 'not_found'}
+
+
+def careers_file_for(homepage_url: str, careers_folder: str = "Job Ads") -> str:
+    """Path of the file recording a company's careers page URL."""
+    os.makedirs(careers_folder, exist_ok=True)
+    return os.path.join(careers_folder, urlparse(homepage_url).netloc.replace('www.', '') + '.txt')
+
+
+def read_homepages(source: str) -> List[str]:
+    """Read homepage URLs, one per line, from a file or '-' for stdin."""
+    stream = sys.stdin if source == '-' else open(source, 'r', encoding='utf-8')
+    try:
+        urls = [line.strip() for line in stream]
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    # Drop blanks and comments, keeping the first occurrence of each URL
+    return list(dict.fromkeys(url for url in urls if url and not url.startswith('#')))
+
+
+def open_crawl_state(crawler_options: dict) -> Optional[CrawlState]:
+    """The crawl state the workers use, for the parent to commit their results to."""
+    state_path = crawler_options.get('state_path', DEFAULT_STATE_PATH)
+    return CrawlState(state_path) if state_path else None
+
+
+def commit_crawl_state(state: Optional[CrawlState], homepage_url: str, listing_hashes: Dict[str, str],
+                       closed_urls: List[str]):
+    """Record a company's extracted listings and closures, once they are written to the job store."""
+    if state is not None:
+        state.commit_extraction(urlparse(homepage_url).netloc, listing_hashes, closed_urls)
+
+
+def crawl_company(homepage_url: str, crawler_options: dict) -> Tuple[str, str, List[dict], List[str], Dict[str, str], dict]:
+    """Worker entry point: crawl one company.
+
+    Returns (url, status, new or changed job ads, URLs of closed listings,
+    hashes of the extracted listings, drained metrics). The caller commits
+    the hashes and closures to the crawl state once the ads are written.
+    """
+    with metrics.tagged(company=urlparse(homepage_url).netloc):
+        with metrics.timer('company_seconds'):
+            status, job_ads, closed_urls, listing_hashes = _crawl_company(homepage_url, crawler_options)
+        metrics.inc('companies_total', status=status)
+    return homepage_url, status, job_ads, closed_urls, listing_hashes, metrics.drain()
+
+
+def _crawl_company(homepage_url: str, crawler_options: dict) -> Tuple[str, List[dict], List[str], Dict[str, str]]:
+    logger.info(f"🏢 Attempting to scrape job ads from: {homepage_url}")
+    crawler = JobCrawler(homepage_url, **crawler_options)
+    try:
+        if not crawler.find_job_page():
+            return 'not_found', [], [], {}
+        crawler.save_job_page_url(careers_file_for(homepage_url))
+        job_ads = [asdict(job_ad) for job_ad in crawler.extract_job_ads()]
+        return 'done', job_ads, crawler.closed_urls, crawler.extracted_hashes
+    except Exception:
+        logger.exception(f"💥 Crawl failed for {homepage_url}")
+        return 'error', [], [], {}
+    finally:
+        crawler.close()
+
+
+class BatchRunner:
+    """Fans companies out to a process pool and records each finished one in a checkpoint.
+
+    Job ads are written by the parent process, so the output file has a single
+    writer. A company's listing hashes and closures are committed to the crawl
+    state, and the company checkpointed, only once its ads are on disk. Each
+    worker's metrics come back with its results and are merged in the parent.
+    If a worker process dies, the companies in flight are checkpointed as
+    errors, to be retried on resume, and the pool is rebuilt.
+    """
+
+    def __init__(self, output_file: str, checkpoint_file: str, workers: int = None, crawler_options: dict = None):
+        self.output_file = output_file
+        self.checkpoint_file = checkpoint_file
+        self.workers = workers or os.cpu_count() or 1
+        self.crawler_options = crawler_options or {}
+        self.state: Optional[CrawlState] = None
+
+    def finished_companies(self) -> Set[str]:
+        finished = set()
+        try:
+            with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Partially written line from an interrupted run
+                    if entry.get('status') in FINISHED_STATUSES:
+                        finished.add(entry['url'])
+        except FileNotFoundError:
+            pass
+        return finished
+
+    def run(self, homepage_urls: Iterable[str]):
+        finished = self.finished_companies()
+        pending = [url for url in homepage_urls if url not in finished]
+        logger.info(f"📦 Batch: {len(pending)} companies to crawl, {len(finished)} already finished, {self.workers} workers")
+
+        queue = iter(pending)
+        in_flight: Dict[Future, str] = {}
+        pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.state = open_crawl_state(self.crawler_options)
+        try:
+            with JobStore(self.output_file) as job_store, \
+                    open(self.checkpoint_file, 'a', encoding='utf-8') as checkpoint:
+                while True:
+                    # Keep the pool busy without materialising a future per company
+                    while len(in_flight) < self.workers * 2:
+                        url = next(queue, None)
+                        if url is None:
+                            break
+                        in_flight[pool.submit(crawl_company, url, self.crawler_options)] = url
+                    if not in_flight:
+                        break
+
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    broken = False
+                    for future in done:
+                        broken |= self._finish(in_flight.pop(future), future, job_store, checkpoint)
+                    if broken:
+                        # A worker process died and took the pool with it; its companies were recorded as errors
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        pool = ProcessPoolExecutor(max_workers=self.workers)
+        finally:
+            pool.shutdown(cancel_futures=True)
+            if self.state is not None:
+                self.state.close()
+                self.state = None
+
+    def _finish(self, url: str, future: Future, job_store: JobStore, checkpoint) -> bool:
+        """Write a finished company's results and checkpoint it; returns True if the pool broke."""
+        try:
+            homepage_url, status, job_ads, closed_urls, listing_hashes, worker_metrics = future.result()
+        except BrokenProcessPool as e:
+            logger.error(f"💥 A worker process died before {url} finished: {e}")
+            with metrics.tagged(company=urlparse(url).netloc):
+                metrics.inc('companies_total', status='error')
+            self._checkpoint(checkpoint, url, 'error', 0, 0)
+            return True
+        metrics.merge(worker_metrics)
+        for job_ad in job_ads:
+            job_store.add(JobAd(**job_ad))
+        job_store.mark_closed(closed_urls)
+        job_store.flush()
+        commit_crawl_state(self.state, homepage_url, listing_hashes, closed_urls)
+        self._checkpoint(checkpoint, homepage_url, status, len(job_ads), len(closed_urls))
+        logger.info(f"✅ [{status}] {homepage_url}: {len(job_ads)} job ads")
+        return False
+
+    @staticmethod
+    def _checkpoint(checkpoint, url: str, status: str, jobs: int, closed: int):
+        checkpoint.write(json.dumps({
+            'url': url, 'status': status, 'jobs': jobs, 'closed': closed, 'finished_at': time.time(),
+        }) + '\n')
+        checkpoint.flush()
+
+
+@dataclass
+class TaskResult:
+    """What a queue worker sends back for one task.
+
+    ``listings`` is set when a company's listings are left for listing tasks:
+    the careers page URL, the listing URLs and their last extracted hashes.
+    ``listing_hashes`` are those of the listings extracted by this task, to be
+    committed to the crawl state along with ``closed_urls`` once written.
+    """
+    status: str
+    job_ads: List[dict] = field(default_factory=list)
+    closed_urls: List[str] = field(default_factory=list)
+    listing_hashes: Dict[str, str] = field(default_factory=dict)
+    listings: Optional[dict] = None
+    error: Optional[str] = None
+    metrics: dict = field(default_factory=dict)
+
+
+def run_task(kind: str, payload: dict, crawler_options: dict) -> TaskResult:
+    """Worker entry point for queued crawls: run one company or listing task."""
+    homepage_url = payload['homepage_url']
+    with metrics.tagged(company=urlparse(homepage_url).netloc):
+        try:
+            if kind == 'company':
+                result = _discover_company(homepage_url, crawler_options)
+                metrics.inc('companies_total', status=result.status)
+            else:
+                result = _extract_listings(homepage_url, payload, crawler_options)
+        except Exception as e:
+            logger.exception(f"💥 {kind} task failed for {homepage_url}")
+            result = TaskResult('error', error=f"{type(e).__name__}: {e}")
+    result.metrics = metrics.drain()
+    return result
+
+
+def _discover_company(homepage_url: str, crawler_options: dict) -> TaskResult:
+    logger.info(f"🏢 Looking for job listings of: {homepage_url}")
+    crawler = JobCrawler(homepage_url, **crawler_options)
+    try:
+        if not crawler.find_job_page():
+            return TaskResult('not_found')
+        crawler.save_job_page_url(careers_file_for(homepage_url))
+        if crawler.ats_job_ads:
+            # Feed ads need no fetching or LLM calls, so there is nothing worth handing on
+            job_ads = [asdict(job_ad) for job_ad in crawler.extract_job_ads()]
+            return TaskResult('done', job_ads, crawler.closed_urls, crawler.extracted_hashes)
+        job_urls = set(crawler.job_urls)
+        return TaskResult('done', closed_urls=crawler.closed_urls, listings={
+            'job_page_url': crawler.job_page_url,
+            'job_urls': crawler.job_urls,
+            'known_hashes': {url: known for url, known in crawler.known_hashes.items() if url in job_urls},
+        })
+    finally:
+        crawler.close()
+
+
+def _extract_listings(homepage_url: str, payload: dict, crawler_options: dict) -> TaskResult:
+    crawler = JobCrawler(homepage_url, **crawler_options)
+    try:
+        crawler.use_listings(payload['job_page_url'], payload['job_urls'], payload['known_hashes'])
+        job_ads = [asdict(job_ad) for job_ad in crawler.extract_job_ads()]
+        return TaskResult('done', job_ads, listing_hashes=crawler.extracted_hashes)
+    finally:
+        crawler.close()
+
+
+class QueueRunner:
+    """Drains a shared WorkQueue of company and listing tasks with a local process pool.
+
+    A company task finds the careers page and splits its listings into
+    listing tasks of ``listings_per_task``, so a large company spreads over
+    many workers. This process holds the leases, heartbeating them while
+    tasks run, and writes job ads, then commits the task's listing hashes and
+    closures to the crawl state, before completing it, so a crash repeats
+    work rather than losing it. It keeps polling until no task is
+    pending or leased anywhere, which lets it pick up the expired leases of
+    a worker that died, whether in another process or on another machine.
+    """
+
+    def __init__(self, output_file: str, work_queue: WorkQueue, workers: int = None, crawler_options: dict = None,
+                 listings_per_task: int = 50, poll_interval: float = 5):
+        self.output_file = output_file
+        self.queue = work_queue
+        self.workers = workers or os.cpu_count() or 1
+        self.crawler_options = crawler_options or {}
+        self.listings_per_task = listings_per_task
+        self.poll_interval = poll_interval
+        self.owner = default_owner()
+        self.state: Optional[CrawlState] = None
+
+    def enqueue(self, homepage_urls: Iterable[str]) -> int:
+        homepage_urls = list(homepage_urls)
+        added = self.queue.put_many('company', [(url, {'homepage_url': url}) for url in homepage_urls])
+        logger.info(f"📥 Queued {added} companies, {len(homepage_urls) - added} were already queued")
+        return added
+
+    def run(self):
+        logger.info(f"📦 Draining work queue {self.queue.db_path} as {self.owner} with {self.workers} workers")
+        heartbeat_every = self.queue.lease_seconds / 3
+        last_heartbeat = time.monotonic()
+        in_flight: Dict[Future, Task] = {}
+        pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.state = open_crawl_state(self.crawler_options)
+        try:
+            with JobStore(self.output_file) as job_store:
+                while True:
+                    # Only lease what can start now; a lease waiting in the pool would just burn its time
+                    while len(in_flight) < self.workers:
+                        task = self.queue.lease(self.owner)
+                        if task is None:
+                            break
+                        in_flight[pool.submit(run_task, task.kind, task.payload, self.crawler_options)] = task
+                    if not in_flight:
+                        if not self.queue.unfinished():
+                            break
+                        # Other workers hold the rest; wait for them to finish or their leases to expire
+                        time.sleep(self.poll_interval)
+                        continue
+
+                    done, _ = wait(in_flight, timeout=min(heartbeat_every, self.poll_interval), return_when=FIRST_COMPLETED)
+                    if time.monotonic() - last_heartbeat >= heartbeat_every:
+                        for future, task in in_flight.items():
+                            if future not in done:
+                                self.queue.heartbeat(task, self.owner)
+                        last_heartbeat = time.monotonic()
+                    broken = False
+                    for future in done:
+                        broken |= self._finish(in_flight.pop(future), future, job_store)
+                    if broken:
+                        # A worker process died and took the pool with it; its tasks were failed above
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        pool = ProcessPoolExecutor(max_workers=self.workers)
+        finally:
+            pool.shutdown(cancel_futures=True)
+            if self.state is not None:
+                self.state.close()
+                self.state = None
+        logger.info(f"📦 Work queue drained: {self.queue.counts()}")
+
+    def _finish(self, task: Task, future: Future, job_store: JobStore) -> bool:
+        """Write a finished task's results and settle its lease; returns True if the pool broke."""
+        try:
+            result = future.result()
+        except BrokenProcessPool as e:
+            self.queue.fail(task, self.owner, f"worker process died: {e}")
+            return True
+        metrics.merge(result.metrics)
+        if result.status == 'error':
+            self.queue.fail(task, self.owner, result.error)
+            return False
+
+        for job_ad in result.job_ads:
+            job_store.add(JobAd(**job_ad))
+        job_store.mark_closed(result.closed_urls)
+        job_store.flush()
+        commit_crawl_state(self.state, task.payload['homepage_url'], result.listing_hashes, result.closed_urls)
+        follow_ups = self._listing_tasks(task.key, result.listings) if result.listings else []
+        self.queue.complete(task, self.owner, follow_ups)
+        queued = f", {len(follow_ups)} listing tasks queued" if follow_ups else ""
+        logger.info(f"✅ [{result.status}] {task.kind} task {task.key}: {len(result.job_ads)} job ads{queued}")
+        return False
+
+    def _listing_tasks(self, homepage_url: str, listings: dict) -> List[Tuple[str, str, dict, int]]:
+        """Split a company's listings into listing tasks, run ahead of new companies to finish those started."""
+        job_urls = listings['job_urls']
+        tasks = []
+        for start in range(0, len(job_urls), self.listings_per_task):
+            chunk = job_urls[start:start + self.listings_per_task]
+            tasks.append(('listings', f"{homepage_url} #{start // self.listings_per_task + 1}", {
+                'homepage_url': homepage_url,
+                'job_page_url': listings['job_page_url'],
+                'job_urls': chunk,
+                'known_hashes': {url: listings['known_hashes'][url] for url in chunk if url in listings['known_hashes']},
+            }, 1))
+        return tasks
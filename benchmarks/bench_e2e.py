@@ -0,0 +1,185 @@
+""" Offline end-to-end benchmark: crawls a synthetic corpus against local fake web and LLM servers
+
+Usage:
+    python benchmarks/bench_e2e.py [--companies 50] [--workers 4] [--llm-latency 0.5] [--compare bench_results/e2e-....json]
+
+Every company site is served from its own local port and the OpenAI client is
+pointed at a stub that answers the crawler's prompts after a configurable delay,
+so runs are repeatable and cost nothing. Each run starts from empty HTML and LLM
+caches in a temporary directory. Reports companies/min, pages/sec, LLM calls and
+tokens per company and p50/p95 latency per stage, as recorded by the metrics
+module, and saves them as JSON under bench_results/ so runs can be compared
+with --compare.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.join(BENCH_DIR, '..')
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from fakellm import FakeLLM  # noqa: E402
+from fakeweb import FakeWeb, build_corpus  # noqa: E402
+
+HEADLINE_METRICS = ('companies_per_min', 'pages_per_sec', 'llm_calls_per_company', 'llm_tokens_per_company', 'job_recall')
+
+# Reported percentiles: (row name, histogram name, label filter)
+STAGES = [
+    ('company', 'company_seconds', {}),
+    ('discover', 'stage_seconds', {'stage': 'discover'}),
+    ('extract', 'stage_seconds', {'stage': 'extract'}),
+    ('fetch', 'fetch_seconds', {}),
+    ('parse', 'parse_seconds', {}),
+    ('llm', 'llm_seconds', {}),
+    ('llm_queue', 'llm_queue_seconds', {}),
+]
+
+
+def summarise_stages(metrics):
+    stages = {}
+    for row, name, labels in STAGES:
+        histogram = metrics.histogram(name, **labels)
+        if histogram.count:
+            stages[row] = {
+                'count': histogram.count,
+                'p50_ms': round(histogram.percentile(50) * 1000, 2),
+                'p95_ms': round(histogram.percentile(95) * 1000, 2),
+                'mean_ms': round(histogram.sum / histogram.count * 1000, 2),
+            }
+    return stages
+
+
+def run(args):
+    sites = build_corpus(args.companies, seed=args.seed, structured_share=args.structured_share)
+    web = FakeWeb(sites, latency=args.page_latency)
+    llm = FakeLLM(latency=args.llm_latency, jitter=args.llm_jitter, rpm=args.llm_rpm, seed=args.seed)
+    homepages = web.start()
+    os.environ['OPENAI_API_KEY'] = 'sk-bench'
+    os.environ['OPENAI_BASE_URL'] = llm.start()
+
+    os.environ['SCROUNGER_METRICS'] = '1'
+    from batchrunner import crawl_company
+    from metrics import metrics
+    metrics.enable()
+
+    # Cold caches for every run
+    workdir = tempfile.mkdtemp(prefix='scrounger-bench-')
+    os.chdir(workdir)
+
+    crawler_options = {'max_batch_listings': args.listings_per_request, 'max_pages': args.max_pages,
+                       'parse_workers': args.parse_workers}
+    statuses = Counter()
+    jobs_found = 0
+    expected = {url: site.job_count for url, site in zip(homepages, sites)}
+    jobs_expected = 0
+
+    start = time.perf_counter()
+    context = multiprocessing.get_context('fork')
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=context) as pool:
+        futures = [pool.submit(crawl_company, url, crawler_options) for url in homepages]
+        for future in futures:
+            homepage_url, status, job_ads, _, _, worker_metrics = future.result()
+            metrics.merge(worker_metrics)
+            statuses[status] += 1
+            jobs_found += len(job_ads)
+            jobs_expected += expected[homepage_url]
+    elapsed = time.perf_counter() - start
+    web.stop()
+    llm.stop()
+
+    llm_tokens = llm.prompt_tokens + llm.completion_tokens
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {key: value for key, value in vars(args).items() if key not in ('compare', 'output_dir', 'verbose')},
+        'summary': {
+            'elapsed_sec': round(elapsed, 2),
+            'companies_per_min': round(args.companies / elapsed * 60, 2),
+            'pages_per_sec': round(web.requests / elapsed, 2),
+            'pages_served': web.requests,
+            'mb_served': round(web.bytes_sent / 1e6, 2),
+            'llm_calls': llm.calls,
+            'llm_rate_limited': llm.rate_limited,
+            'llm_calls_per_company': round(llm.calls / args.companies, 2),
+            'llm_prompt_tokens': llm.prompt_tokens,
+            'llm_completion_tokens': llm.completion_tokens,
+            'llm_tokens_per_company': round(llm_tokens / args.companies, 1),
+            'jobs_found': jobs_found,
+            'jobs_in_corpus': sum(expected.values()),
+            'job_recall': round(jobs_found / jobs_expected, 3) if jobs_expected else 0.0,
+            'statuses': dict(statuses),
+        },
+        'stages': summarise_stages(metrics),
+        'seconds_by_stage': metrics.summary()['seconds_by_stage'],
+    }
+
+
+def print_report(results):
+    summary = results['summary']
+    print(f"{results['config']['companies']} companies in {summary['elapsed_sec']}s "
+          f"({summary['companies_per_min']} companies/min, {summary['pages_per_sec']} pages/sec)")
+    print(f"LLM: {summary['llm_calls']} calls ({summary['llm_calls_per_company']}/company), "
+          f"{summary['llm_tokens_per_company']} tokens/company, {summary['llm_rate_limited']} rate limited")
+    print(f"Jobs: {summary['jobs_found']} found, recall {summary['job_recall']}, statuses {summary['statuses']}")
+    print(f"{'stage':<10} {'count':>7} {'p50 ms':>10} {'p95 ms':>10} {'mean ms':>10}")
+    for stage, stats in results['stages'].items():
+        print(f"{stage:<10} {stats['count']:>7} {stats['p50_ms']:>10} {stats['p95_ms']:>10} {stats['mean_ms']:>10}")
+
+
+def print_comparison(results, baseline_file):
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_file} ({baseline['timestamp']}):")
+    rows = [(metric, baseline['summary'].get(metric), results['summary'].get(metric)) for metric in HEADLINE_METRICS]
+    for stage, stats in results['stages'].items():
+        rows.append((f"{stage} p95_ms", baseline['stages'].get(stage, {}).get('p95_ms'), stats['p95_ms']))
+    for name, before, after in rows:
+        change = f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+        print(f"{name:<24} {before!s:>12} -> {after!s:>12} {change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end crawl benchmark")
+    parser.add_argument("--companies", type=int, default=50, help="Number of synthetic company sites")
+    parser.add_argument("--workers", type=int, default=4, help="Companies crawled in parallel (processes)")
+    parser.add_argument("--seed", type=int, default=7, help="Seed for the synthetic corpus and LLM jitter")
+    parser.add_argument("--structured-share", type=float, default=0.5, help="Share of job pages carrying JSON-LD")
+    parser.add_argument("--page-latency", type=float, default=0.0, help="Seconds the fake web server waits per page")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Mean seconds per fake LLM completion")
+    parser.add_argument("--llm-jitter", type=float, default=0.2, help="Uniform +/- jitter on LLM latency")
+    parser.add_argument("--llm-rpm", type=int, default=0, help="Requests per minute before the fake LLM returns 429 (0 = unlimited)")
+    parser.add_argument("--listings-per-request", type=int, default=8, help="Job listings per batched LLM extraction request")
+    parser.add_argument("--parse-workers", type=int, default=0, help="Parser processes per company worker (0 parses in a thread, as batch mode does)")
+    parser.add_argument("--max-pages", type=int, default=25, help="Crawl budget per company")
+    parser.add_argument("--output-dir", default=os.path.join(os.getcwd(), "bench_results"), help="Folder for JSON results")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    parser.add_argument("--verbose", action="store_true", help="Show the crawler's log output")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    output_dir = os.path.abspath(args.output_dir)
+    compare = os.path.abspath(args.compare) if args.compare else None
+
+    results = run(args)
+    print_report(results)
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_file = os.path.join(output_dir, f"e2e-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved results to {output_file}")
+
+    if compare:
+        print_comparison(results, compare)
+
+
+if __name__ == "__main__":
+    main()
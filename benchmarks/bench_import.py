@@ -0,0 +1,57 @@
+""" Startup benchmark: import time of each module and of `main.py --help` in fresh interpreters
+
+Usage:
+    python benchmarks/bench_import.py [--repeat 5]
+
+Each measurement runs in a new subprocess so nothing is already imported.
+Times are medians with bare interpreter startup subtracted. The report also
+lists which heavy third-party modules (openai, bs4, aiohttp, dotenv) each
+import pulls in, since they should only load on first use.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+HEAVY_MODULES = ('openai', 'bs4', 'aiohttp', 'dotenv', 'requests')
+MODULES = ['main', 'batchrunner', 'jobcrawler', 'urlextractor', 'urlvalidator', 'llmclient', 'webpagescraper',
+           'htmlreducer', 'structureddata', 'atsdetector', 'linkextractor', 'jobstore', 'metrics']
+
+PROBE = "import sys; import {module}; print(','.join(m for m in {heavy!r} if m in sys.modules))"
+
+
+def timed_run(args):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, *args], cwd=REPO_ROOT, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr}")
+    return elapsed, result.stdout.strip()
+
+
+def median_ms(args, repeat):
+    return statistics.median(timed_run(args)[0] for _ in range(repeat)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark module import and CLI startup time")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the median is reported")
+    args = parser.parse_args()
+
+    baseline = median_ms(['-c', 'pass'], args.repeat)
+    print(f"Interpreter startup: {baseline:.1f} ms (subtracted below)\n")
+    print(f"{'import':<18} {'ms':>8}  heavy modules loaded")
+    for module in MODULES:
+        elapsed = median_ms(['-c', f'import {module}'], args.repeat) - baseline
+        _, loaded = timed_run(['-c', PROBE.format(module=module, heavy=HEAVY_MODULES)])
+        print(f"{module:<18} {elapsed:8.1f}  {loaded or '-'}")
+
+    elapsed = median_ms(['main.py', '--help'], args.repeat) - baseline
+    print(f"\n{'main.py --help':<18} {elapsed:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
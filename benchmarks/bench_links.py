@@ -0,0 +1,109 @@
+""" Micro-benchmark for link extraction over a corpus of cached pages
+
+Usage:
+    python benchmarks/bench_links.py [--corpus HTML_Cache] [--repeat 3]
+
+Compares a full BeautifulSoup tree, BeautifulSoup with a SoupStrainer,
+lxml (when installed) and the anchor-only scanner in linkextractor. If the corpus folder
+has no cached pages (segment store or .html files) a synthetic corpus is generated instead.
+"""
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+from urllib.parse import urljoin
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from linkextractor import extract_links  # noqa: E402
+
+BASE_URL = "https://www.example.com/"
+
+
+def load_corpus(folder):
+    pages = []
+    segments = os.path.join(folder, 'segments')
+    if os.path.exists(os.path.join(segments, 'index.dat')):
+        from segmentstore import SegmentStore
+        store = SegmentStore(segments)
+        pages.extend(entry[1] for entry in map(store.get, store.keys()) if entry is not None)
+    for path in sorted(glob.glob(os.path.join(folder, '*.html'))):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            pages.append(f.read())
+    return pages
+
+
+def synthetic_corpus(count=50, seed=1):
+    rng = random.Random(seed)
+    pages = []
+    for _ in range(count):
+        body = []
+        for i in range(rng.randint(200, 800)):
+            kind = rng.random()
+            if kind < 0.3:
+                body.append(f'<li><a href="/jobs/{i}-role?utm_source=x#apply">Role {i}</a></li>')
+            elif kind < 0.4:
+                body.append(f'<a href="https://other{i % 7}.com/page">External</a>')
+            else:
+                body.append(f'<div class="c{i}"><p>Paragraph {i} with <b>bold</b> text.</p></div>')
+        pages.append('<html><head><title>t</title><script>var x = "<a href=/no>";</script></head>'
+                     f'<body>{"".join(body)}</body></html>')
+    return pages
+
+
+def bs4_full(html):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    return {urljoin(BASE_URL, a['href']) for a in soup.find_all('a', href=True)}
+
+
+def bs4_strainer(html):
+    from bs4 import BeautifulSoup, SoupStrainer
+    soup = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer('a', href=True))
+    return {urljoin(BASE_URL, a['href']) for a in soup.find_all('a', href=True)}
+
+
+def lxml_links(html):
+    import lxml.html
+    return {urljoin(BASE_URL, href) for href in lxml.html.fromstring(html).xpath('//a/@href')}
+
+
+def anchor_scan(html):
+    return extract_links(html, BASE_URL)
+
+
+def bench(name, func, pages, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page in pages:
+            func(page)
+        best = min(best, time.perf_counter() - start)
+    size_mb = sum(len(page) for page in pages) / 1e6
+    print(f"{name:<22} {best * 1000 / len(pages):8.2f} ms/page {size_mb / best:8.1f} MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark link extraction strategies")
+    parser.add_argument("--corpus", default="HTML_Cache", help="HTML cache folder (segment store or .html files)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per strategy; the best is reported")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus) or synthetic_corpus()
+    print(f"{len(pages)} pages, {sum(len(p) for p in pages) / 1e6:.1f} MB")
+
+    strategies = [('bs4 html.parser', bs4_full), ('bs4 + SoupStrainer', bs4_strainer), ('linkextractor', anchor_scan)]
+    try:
+        import lxml.html  # noqa: F401
+        strategies.insert(2, ('lxml', lxml_links))
+    except ImportError:
+        print("lxml not installed, skipping")
+
+    for name, func in strategies:
+        bench(name, func, pages, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
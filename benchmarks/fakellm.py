@@ -0,0 +1,144 @@
+""" Local stand-in for the OpenAI chat completions API, answering the crawler's prompts deterministically """
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+URL_PATTERN = re.compile(r"https?://[\w.:-]+(?:/[\w./%-]*)?")
+LISTING_PATTERN = re.compile(r"^### LISTING (\S+)\n(.*?)(?=^### LISTING |\Z)", re.MULTILINE | re.DOTALL)
+CAREERS_HINTS = ('careers', 'jobs', 'join-us', 'people')
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _job_urls(prompt: str):
+    return list(dict.fromkeys(url for url in URL_PATTERN.findall(prompt) if '/jobs/' in url))
+
+
+def _listing_fields(text: str) -> dict:
+    lines = [line.strip('# ').strip() for line in text.splitlines() if line.strip()]
+    location = next((line.split(':', 1)[1].strip() for line in lines if line.startswith('Location:')), '')
+    return {'title': lines[0] if lines else '', 'description': ' '.join(lines[1:])[:400], 'location': location, 'salary': ''}
+
+
+def answer(prompt: str) -> str:
+    """Reply to one of the crawler's prompts the way a well-behaved model would."""
+    if '### LISTING' in prompt:
+        jobs = [{'id': listing_id, **_listing_fields(text)} for listing_id, text in LISTING_PATTERN.findall(prompt)]
+        return json.dumps({'jobs': jobs})
+    if 'most likely to contain the company' in prompt:
+        urls = URL_PATTERN.findall(prompt.split('\n\n', 1)[-1])
+        return next((url for url in urls if any(hint in url for hint in CAREERS_HINTS) and '/jobs/' not in url), 'None')
+    if 'extract job information' in prompt:
+        fields = _listing_fields(prompt.split('Page content:', 1)[-1])
+        return 'url,title,description,company,location,salary\n' + ','.join(
+            json.dumps(fields[key]) if key in fields else '""' for key in ('url', 'title', 'description', 'company', 'location', 'salary'))
+    if 'career/jobs page' in prompt:
+        return 'VALID_CAREER_PAGE\nExplanation: the page lists open roles.'
+    if 'confirm if they are job listings' in prompt:
+        urls = _job_urls(prompt)
+        return '\n'.join(['VALID_JOB_LISTINGS', *urls]) if urls else 'NO_VALID_JOB_LISTINGS'
+    if 'identify job listings' in prompt:
+        urls = _job_urls(prompt)
+        return '\n'.join(['JOB_LISTINGS', *urls]) if urls else 'NO_RESULTS'
+    return 'None'
+
+
+class FakeLLM:
+    """Serves POST /v1/chat/completions with configurable latency, jitter and an optional RPM limit.
+
+    Requests over ``rpm`` in any rolling minute get a 429 with Retry-After,
+    so the client's rate limiting is exercised as it would be against the
+    real API.
+    """
+
+    def __init__(self, latency: float = 0.5, jitter: float = 0.2, rpm: int = 0, seed: int = 7):
+        self.latency = latency
+        self.jitter = jitter
+        self.rpm = rpm
+        self.calls = 0
+        self.rate_limited = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._random = random.Random(seed)
+        self._recent = deque()
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/v1"
+
+    def start(self) -> str:
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _admit(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            if self.rpm and len(self._recent) >= self.rpm:
+                self.rate_limited += 1
+                return False
+            self._recent.append(now)
+            return True
+
+    def _delay(self) -> float:
+        with self._lock:
+            return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+    def _handler(self):
+        llm = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                if not llm._admit():
+                    return self._reply(429, {'error': {'message': 'Rate limit reached', 'type': 'requests'}},
+                                       {'Retry-After': '1'})
+                time.sleep(llm._delay())
+                prompt = '\n'.join(message.get('content') or '' for message in request.get('messages', []))
+                content = answer(prompt)
+                usage = {'prompt_tokens': estimate_tokens(prompt), 'completion_tokens': estimate_tokens(content)}
+                usage['total_tokens'] = usage['prompt_tokens'] + usage['completion_tokens']
+                with llm._lock:
+                    llm.calls += 1
+                    llm.prompt_tokens += usage['prompt_tokens']
+                    llm.completion_tokens += usage['completion_tokens']
+                self._reply(200, {
+                    'id': f"chatcmpl-{llm.calls}",
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': request.get('model', 'gpt-3.5-turbo'),
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+                    'usage': usage,
+                })
+
+            def _reply(self, status: int, payload: dict, headers: dict = None):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
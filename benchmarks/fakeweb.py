@@ -0,0 +1,115 @@
+""" Synthetic company websites served from local HTTP servers for offline benchmarks """
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+ROLES = ['Software Engineer', 'Data Analyst', 'Product Manager', 'Designer', 'Account Executive',
+         'Support Specialist', 'DevOps Engineer', 'Marketing Lead', 'Recruiter', 'QA Engineer']
+CITIES = ['London', 'Manchester', 'Leeds', 'Bristol', 'Edinburgh', 'Remote']
+CAREERS_LINKS = [('careers', 'Careers'), ('jobs', 'Jobs'), ('join-us', 'Join us'), ('people', 'Our people')]
+FILLER = ("We build thoughtful products for customers around the world. Our teams value curiosity, "
+          "ownership and kindness, and we invest in everyone's growth. ")
+
+
+@dataclass
+class SyntheticSite:
+    """One company's pages, keyed by path."""
+    name: str
+    pages: Dict[str, str] = field(default_factory=dict)
+    job_count: int = 0
+
+
+def build_site(index: int, rng: random.Random, structured_share: float) -> SyntheticSite:
+    name = f"Company {index}"
+    site = SyntheticSite(name=name)
+    careers_slug, careers_text = rng.choice(CAREERS_LINKS)
+    nav = ''.join(f'<li><a href="/{slug}">{text}</a></li>' for slug, text in
+                  [('about', 'About'), ('products', 'Products'), ('blog', 'Blog'), ('contact', 'Contact'),
+                   (careers_slug, careers_text)])
+    blog_links = ''.join(f'<a href="/blog/post-{i}">Post {i}</a>' for i in range(rng.randint(5, 20)))
+    site.pages['/'] = (f'<html><head><title>{name}</title><style>body{{margin:0}}</style></head><body>'
+                       f'<nav><ul>{nav}</ul></nav><main><h1>{name}</h1><p>{FILLER * 3}</p>{blog_links}</main>'
+                       f'<footer>&copy; {name}</footer></body></html>')
+    for slug in ('about', 'products', 'blog', 'contact'):
+        site.pages[f'/{slug}'] = f'<html><head><title>{slug.title()}</title></head><body><p>{FILLER}</p></body></html>'
+
+    jobs = []
+    site.job_count = rng.randint(3, 30)
+    for job_id in range(1, site.job_count + 1):
+        role, city = rng.choice(ROLES), rng.choice(CITIES)
+        path = f"/{careers_slug}/jobs/{1000 + job_id}-{role.lower().replace(' ', '-')}"
+        jobs.append(f'<li><a href="{path}">{role}</a> &middot; {city}</li>')
+        description = FILLER * rng.randint(5, 25)
+        json_ld = ''
+        if rng.random() < structured_share:
+            json_ld = '<script type="application/ld+json">' + json.dumps({
+                '@context': 'https://schema.org', '@type': 'JobPosting', 'title': role, 'description': description,
+                'jobLocation': {'@type': 'Place', 'address': {'addressLocality': city}},
+            }) + '</script>'
+        site.pages[path] = (f'<html><head><title>{role} - {name}</title>{json_ld}</head><body><nav>{nav}</nav>'
+                            f'<main><h1>{role}</h1><p>Location: {city}</p><p>{description}</p></main></body></html>')
+    site.pages[f'/{careers_slug}'] = (f'<html><head><title>Careers at {name}</title></head><body><nav><ul>{nav}</ul></nav>'
+                                      f'<main><h1>Open roles</h1><ul>{"".join(jobs)}</ul></main></body></html>')
+    return site
+
+
+def build_corpus(count: int, seed: int = 7, structured_share: float = 0.5) -> List[SyntheticSite]:
+    rng = random.Random(seed)
+    return [build_site(index, rng, structured_share) for index in range(count)]
+
+
+class FakeWeb:
+    """Serves each synthetic site on its own local port so every company has a distinct origin."""
+
+    def __init__(self, sites: List[SyntheticSite], latency: float = 0.0):
+        self.sites = sites
+        self.latency = latency
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._servers = []
+
+    def start(self) -> List[str]:
+        """Start one server per site and return their homepage URLs."""
+        homepages = []
+        for site in self.sites:
+            server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler(site))
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self._servers.append(server)
+            homepages.append(f"http://127.0.0.1:{server.server_port}/")
+        return homepages
+
+    def stop(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+
+    def _handler(self, site: SyntheticSite):
+        web = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                if web.latency:
+                    time.sleep(web.latency)
+                page = site.pages.get(self.path.split('?')[0].rstrip('/') or '/')
+                body = (page or 'Not found').encode('utf-8')
+                self.send_response(200 if page else 404)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with web._lock:
+                    web.requests += 1
+                    web.bytes_sent += len(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
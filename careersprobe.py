@@ -0,0 +1,126 @@
+""" Probes conventional careers URLs concurrently when a site's links don't lead to its careers page """
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from asyncfetcher import AsyncFetcher
+from metrics import metrics
+from urlutils import canonicalize_url, site_host
+
+if TYPE_CHECKING:
+    from frontier import RobotsCache
+
+logger = logging.getLogger(__name__)
+
+CAREERS_PATHS = ['careers', 'jobs', 'work-with-us', 'join-our-team', 'join-us', 'about/careers', 'company/careers']
+LOCALES = ['en', 'en-us', 'en-gb']
+LOCALE_PATHS = ['careers', 'jobs']
+SUBDOMAINS = ['careers', 'jobs']
+PAGE_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+
+def candidate_urls(homepage_url: str) -> List[str]:
+    """Conventional careers page URLs for a site, most common first."""
+    parsed = urlparse(homepage_url)
+    base = f"{parsed.scheme or 'https'}://{parsed.netloc}"
+    urls = [f"{base}/{path}" for path in CAREERS_PATHS]
+    urls += [f"{base}/{locale}/{path}" for locale in LOCALES for path in LOCALE_PATHS]
+    urls += [f"https://{subdomain}.{site_host(homepage_url)}" for subdomain in SUBDOMAINS]
+    return urls
+
+
+class CareersProber:
+    """Finds a careers page by probing conventional URLs all at once.
+
+    Every candidate gets a HEAD (or one-byte GET) request at the same time,
+    the first to answer with an HTML page that isn't a redirect back to the
+    homepage wins, and the rest are cancelled. Each site's outcome is kept
+    for ``max_age`` seconds in SQLite, so recrawls and other batch workers
+    don't probe the same site again. "Not found" is only kept if at least
+    one candidate answered, so a site that was down or timing out is probed
+    again next time. With ``robots``, candidates that robots.txt disallows
+    are neither probed nor returned.
+    """
+
+    def __init__(self, fetcher: AsyncFetcher, db_path: str = ":memory:", max_age: float = 7 * 86400,
+                 timeout: float = 10, robots: Optional['RobotsCache'] = None):
+        self.fetcher = fetcher
+        self.robots = robots
+        self.max_age = max_age
+        self.timeout = timeout
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        # Used from the fetch loop's thread, the same as URLTemplates
+        self._db = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS careers_probes (site TEXT PRIMARY KEY, url TEXT, probed_at REAL)")
+        self._db.commit()
+
+    async def afind(self, homepage_url: str, skip: Callable[[str], bool] = lambda url: False) -> Optional[str]:
+        """Return the careers page URL, or None if no candidate serves one; ``skip`` excludes candidates."""
+        # Keyed by host and port, without a leading 'www.'
+        site = urlparse(canonicalize_url(homepage_url)).netloc
+        site = site[4:] if site.startswith('www.') else site
+        row = self._db.execute("SELECT url, probed_at FROM careers_probes WHERE site = ?", (site,)).fetchone()
+        if row is not None and time.time() - row[1] < self.max_age:
+            metrics.inc('careers_probe_total', result='cached')
+            logger.info(f"🔎 Using the cached careers URL probe for {site}: {row[0] or 'nothing found'}")
+            return row[0] if row[0] and not skip(row[0]) and await self._allowed([row[0]]) else None
+
+        candidates = await self._allowed([url for url in candidate_urls(homepage_url) if not skip(url)])
+        logger.info(f"🔎 Probing {len(candidates)} conventional careers URLs for {site}")
+        with metrics.timer('careers_probe_seconds'):
+            found, answered = await self._first_page(homepage_url, candidates)
+        if not found and not answered:
+            metrics.inc('careers_probe_total', result='unreachable')
+            logger.info(f"🔎 No careers URL candidate for {site} answered, not caching the probe")
+            return None
+        metrics.inc('careers_probe_total', result='found' if found else 'not_found')
+        self._db.execute("INSERT OR REPLACE INTO careers_probes VALUES (?, ?, ?)", (site, found, time.time()))
+        self._db.commit()
+        return found
+
+    async def _allowed(self, urls: List[str]) -> List[str]:
+        """The URLs robots.txt lets us crawl, checked concurrently."""
+        if self.robots is None:
+            return urls
+        allowed = await asyncio.gather(*(self.robots.aallowed(url) for url in urls))
+        disallowed = [url for url, ok in zip(urls, allowed) if not ok]
+        if disallowed:
+            logger.info(f"🚫 Not probing {len(disallowed)} careers URLs disallowed by robots.txt: {disallowed}")
+        return [url for url, ok in zip(urls, allowed) if ok]
+
+    async def _first_page(self, homepage_url: str, candidates: List[str]) -> Tuple[Optional[str], bool]:
+        """Return the first page found, if any, and whether any candidate answered with an HTTP status."""
+        tasks = [asyncio.ensure_future(self._probe(url, homepage_url)) for url in candidates]
+        answered = False
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                found, status = await next_done
+                answered = answered or status is not None
+                if found is not None:
+                    return found, True
+            return None, answered
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _probe(self, url: str, homepage_url: str) -> Tuple[Optional[str], Optional[int]]:
+        """Return where the candidate leads if it serves a page, else None, with the HTTP status if it answered."""
+        result = await self.fetcher.probe(url, timeout=self.timeout)
+        status = result.status if result.error is None else None
+        if not result.ok:
+            return None, status
+        content_type = result.headers.get('content-type', '').split(';')[0].strip().lower()
+        if content_type and not content_type.startswith(PAGE_CONTENT_TYPES):
+            return None, status
+        # Missing pages often redirect to the homepage instead of returning 404
+        if canonicalize_url(result.url) == canonicalize_url(homepage_url):
+            return None, status
+        return result.url, status
+
+    def close(self):
+        self._db.close()
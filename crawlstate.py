@@ -0,0 +1,121 @@
+""" Remembers each company's careers page and listings so recrawls only extract what changed """
+import hashlib
+import html
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_PATH = "Crawl_State/state.db"
+
+# Scripts other than JSON-LD, styles and comments change between fetches without the listing changing
+NOISE_PATTERN = re.compile(
+    r'<script\b(?![^>]*ld\+json)[^>]*>.*?</script\s*>|<(style|noscript|template)\b.*?</\1\s*>|<!--.*?-->',
+    re.IGNORECASE | re.DOTALL,
+)
+TAG_PATTERN = re.compile(r'<[^>]+>')
+
+
+@dataclass
+class CareersPage:
+    url: str
+    links: Set[str]
+
+
+def content_hash(text: str) -> str:
+    """Hash of a page's text and JSON-LD, ignoring markup, scripts and whitespace."""
+    visible = TAG_PATTERN.sub(' ', NOISE_PATTERN.sub(' ', text))
+    return hashlib.sha1(' '.join(html.unescape(visible).split()).encode('utf-8')).hexdigest()
+
+
+class CrawlState:
+    """Per-company crawl state in SQLite.
+
+    For each company it stores the careers page URL and the links found on it.
+    For each listing it stores whether it is open or closed and a hash of the
+    content last extracted. Hashes and closures are only written once the
+    job ads are saved (see ``commit_extraction``), so a run that fails or is
+    interrupted redoes them next time.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_STATE_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(db_path, timeout=30)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS companies ("
+            "company TEXT PRIMARY KEY, careers_url TEXT, links TEXT, updated_at REAL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS listings ("
+            "url TEXT PRIMARY KEY, company TEXT, content_hash TEXT, status TEXT, "
+            "first_seen REAL, last_seen REAL, closed_at REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS listings_company ON listings (company, status)")
+        self._db.commit()
+
+    def careers_page(self, company: str) -> Optional[CareersPage]:
+        row = self._db.execute("SELECT careers_url, links FROM companies WHERE company = ?", (company,)).fetchone()
+        if row is None or not row[0]:
+            return None
+        return CareersPage(row[0], set(json.loads(row[1] or '[]')))
+
+    def save_careers_page(self, company: str, careers_url: str, links: Iterable[str]):
+        self._db.execute(
+            "INSERT OR REPLACE INTO companies VALUES (?, ?, ?, ?)",
+            (company, careers_url, json.dumps(sorted(set(links))), time.time()),
+        )
+        self._db.commit()
+
+    def listing_hashes(self, company: str) -> Dict[str, str]:
+        """Content hashes of the company's open listings, keyed by URL."""
+        rows = self._db.execute(
+            "SELECT url, content_hash FROM listings WHERE company = ? AND status = 'open'", (company,)
+        )
+        return dict(rows)
+
+    def add_listings(self, company: str, urls: Iterable[str]):
+        """Record listings found on the careers page, keeping hashes of ones already extracted."""
+        now = time.time()
+        self._db.executemany(
+            "INSERT INTO listings VALUES (?, ?, NULL, 'open', ?, ?, NULL) "
+            "ON CONFLICT(url) DO UPDATE SET status = 'open', last_seen = excluded.last_seen, closed_at = NULL",
+            [(url, company, now, now) for url in urls],
+        )
+        self._db.commit()
+
+    def missing_listings(self, company: str, current_urls: Iterable[str]) -> List[str]:
+        """URLs of open listings that are no longer on the careers page."""
+        current = set(current_urls)
+        open_urls = [url for (url,) in self._db.execute(
+            "SELECT url FROM listings WHERE company = ? AND status = 'open'", (company,))]
+        return [url for url in open_urls if url not in current]
+
+    def commit_extraction(self, company: str, listing_hashes: Dict[str, str], closed_urls: Iterable[str]):
+        """Store the content hashes of extracted listings and close removed ones.
+
+        Call this only once their job ads and closures are written to the job
+        store; until then a failed run leaves them to be redone.
+        """
+        now = time.time()
+        closed = list(closed_urls)
+        self._db.executemany(
+            "INSERT INTO listings VALUES (?, ?, ?, 'open', ?, ?, NULL) "
+            "ON CONFLICT(url) DO UPDATE SET company = excluded.company, content_hash = excluded.content_hash, "
+            "status = 'open', last_seen = excluded.last_seen, closed_at = NULL",
+            [(url, company, listing_hash, now, now) for url, listing_hash in listing_hashes.items()],
+        )
+        self._db.executemany("UPDATE listings SET status = 'closed', closed_at = ? WHERE url = ?",
+                             [(now, url) for url in closed])
+        self._db.commit()
+        if closed:
+            logger.info(f"🗄️ Marked {len(closed)} listings closed for {company}")
+
+    def close(self):
+        self._db.close()
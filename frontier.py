@@ -0,0 +1,164 @@
+""" Priority-ordered crawl frontier with canonical URLs, crawl budgets and robots.txt checks """
+import asyncio
+import heapq
+import itertools
+import logging
+from collections import Counter
+from typing import TYPE_CHECKING, Callable, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlparse
+
+from linkscorer import score_link
+from urlutils import canonicalize_url, site_host
+
+if TYPE_CHECKING:
+    from asyncfetcher import AsyncFetcher
+
+logger = logging.getLogger(__name__)
+
+
+class FrontierEntry(NamedTuple):
+    url: str
+    text: str
+    depth: int
+    score: float
+
+
+class RobotsCache:
+    """Fetches and caches one robots.txt parser per origin.
+
+    Statuses are handled as RFC 9309 says: any 4xx, including 401 and 403,
+    means there are no rules and everything is allowed, while a 5xx or a
+    network error means the site is unreachable and everything is
+    disallowed. Either outcome is kept for the life of the cache, so a site
+    whose robots.txt fails is skipped for the rest of the crawl rather than
+    asked again for every URL. Only the first ``max_bytes`` are parsed.
+    """
+
+    def __init__(self, fetcher: 'AsyncFetcher', user_agent: str = '*', max_bytes: int = 500 << 10):
+        self.fetcher = fetcher
+        self.user_agent = user_agent
+        self.max_bytes = max_bytes
+        self._parsers = {}
+        self._loading = {}
+
+    def allowed(self, url: str) -> bool:
+        return self.fetcher.run(self.aallowed(url))
+
+    async def aallowed(self, url: str) -> bool:
+        """Whether robots.txt lets the URL be crawled; call on the fetcher's loop."""
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        parser = self._parsers.get(origin)
+        if parser is None:
+            # Concurrent checks for one origin share a single robots.txt request
+            if origin not in self._loading:
+                self._loading[origin] = asyncio.ensure_future(self._load(origin))
+            parser = self._parsers[origin] = await asyncio.shield(self._loading[origin])
+            self._loading.pop(origin, None)
+        return parser.can_fetch(self.user_agent, url)
+
+    async def _load(self, origin: str):
+        # urllib.robotparser pulls in urllib.request, so it is only imported once a crawl needs it
+        from urllib.robotparser import RobotFileParser
+        parser = RobotFileParser()
+        result = await self.fetcher.fetch(origin + '/robots.txt', partial_bytes=self.max_bytes)
+        if result.ok:
+            parser.parse(result.text.splitlines())
+        elif result.error is None and 400 <= result.status < 500:
+            parser.allow_all = True
+            if result.status in (401, 403):
+                logger.info(f"🤖 robots.txt for {origin} answered HTTP {result.status}, treating it as allowing everything")
+        elif result.error is None:
+            parser.disallow_all = True
+            logger.warning(f"🚫 robots.txt for {origin} answered HTTP {result.status}, not crawling the site")
+        else:
+            # Usually a host that doesn't exist, such as a careers subdomain the prober guessed
+            parser.disallow_all = True
+            logger.info(f"🚫 robots.txt for {origin} is unreachable ({result.error}), not crawling the site")
+        return parser
+
+
+class CrawlFrontier:
+    """Hands out the most promising unvisited URL first.
+
+    Entries are ordered by job-likelihood score, then by depth. URLs are
+    compared in canonical form, so fragment, trailing-slash and tracking
+    parameter variants are only crawled once. Each site is limited to
+    ``max_depth`` link hops and ``max_pages`` visited pages, and URLs that
+    robots.txt disallows are dropped when they reach the front of the queue.
+    """
+
+    def __init__(self, max_depth: int = 3, max_pages: int = 25,
+                 scorer: Callable[[str, str], float] = score_link, robots: Optional[RobotsCache] = None):
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.scorer = scorer
+        self.robots = robots
+        self.pages_per_site = Counter()
+        self._heap: List[Tuple[float, int, int, str, str]] = []
+        self._queued = set()
+        self._visited = set()
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def add(self, url: str, text: str = "", depth: int = 0, score: Optional[float] = None) -> bool:
+        """Queue a URL unless it was already queued or visited, or is too deep."""
+        url = canonicalize_url(url)
+        if url in self._queued or url in self._visited or depth > self.max_depth:
+            return False
+        if score is None:
+            score = self.scorer(url, text)
+        self._queued.add(url)
+        heapq.heappush(self._heap, (-score, depth, next(self._counter), url, text))
+        return True
+
+    def add_links(self, links: Iterable[Tuple[str, str]], depth: int) -> int:
+        """Queue (url, anchor text) pairs found on a page, returning how many were new."""
+        return sum(self.add(url, text, depth) for url, text in links)
+
+    def peek(self) -> Optional[FrontierEntry]:
+        """Return the best crawlable entry without removing it."""
+        while self._heap:
+            neg_score, depth, _, url, text = self._heap[0]
+            if self._crawlable(url):
+                return FrontierEntry(url, text, depth, -neg_score)
+            heapq.heappop(self._heap)
+        return None
+
+    def pop(self) -> Optional[FrontierEntry]:
+        """Remove and return the best crawlable entry, marking it visited."""
+        entry = self.peek()
+        if entry is not None:
+            heapq.heappop(self._heap)
+            self.mark_visited(entry.url)
+        return entry
+
+    def mark_visited(self, url: str):
+        url = canonicalize_url(url)
+        if url not in self._visited:
+            self._visited.add(url)
+            self.pages_per_site[site_host(url)] += 1
+
+    def is_visited(self, url: str) -> bool:
+        return canonicalize_url(url) in self._visited
+
+    @property
+    def visited(self) -> List[str]:
+        return list(self._visited)
+
+    def budget_left(self, url: str) -> bool:
+        return self.pages_per_site[site_host(url)] < self.max_pages
+
+    def allowed(self, url: str) -> bool:
+        """Whether robots.txt lets the URL be crawled; also used for URLs picked outside the queue."""
+        if self.robots is not None and not self.robots.allowed(url):
+            logger.info(f"🚫 Skipping URL disallowed by robots.txt: {url}")
+            return False
+        return True
+
+    def _crawlable(self, url: str) -> bool:
+        if url in self._visited or not self.budget_left(url):
+            return False
+        return self.allowed(url)
@@ -0,0 +1,124 @@
+""" Reduces page HTML to compact markdown-ish text that fits an LLM token budget """
+import math
+import re
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
+NOISE_TAGS = ['script', 'style', 'noscript', 'svg', 'iframe', 'template', 'form', 'button']
+# Site chrome, dropped only outside the main content: a job page's <article><header> holds its title
+CHROME_TAGS = ['nav', 'footer', 'header', 'aside']
+BLOCK_TAGS = ['p', 'div', 'section', 'li', 'ul', 'ol', 'br', 'tr', 'table', 'dt', 'dd', 'pre', 'blockquote',
+              'h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+MAIN_CONTENT_SELECTORS = ['main', 'article', '[role=main]', '#content', '.content']
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for OpenAI models (about four characters per token)."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def parse_html(html_content: str) -> 'BeautifulSoup':
+    """Parse HTML and drop elements that never carry job content."""
+    # bs4 is imported on first use to keep startup fast
+    from bs4 import BeautifulSoup
+    return strip_noise(BeautifulSoup(html_content, 'html.parser'))
+
+
+def strip_noise(soup: 'BeautifulSoup') -> 'BeautifulSoup':
+    """Drop scripts, site navigation and comments from an already parsed page, in place."""
+    from bs4 import Comment
+    for tag in soup.find_all(NOISE_TAGS):
+        tag.decompose()
+    for tag in soup.find_all(CHROME_TAGS):
+        if not tag.decomposed and tag.find_parent(is_main_content) is None:
+            tag.decompose()
+    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
+    return soup
+
+
+def is_main_content(tag) -> bool:
+    """True if the tag matches one of MAIN_CONTENT_SELECTORS."""
+    return (tag.name in ('main', 'article') or tag.get('role') == 'main' or tag.get('id') == 'content'
+            or 'content' in (tag.get('class') or []))
+
+
+def html_to_text(html_fragment: str) -> str:
+    """Flatten an HTML fragment, such as a feed's job description, to plain text."""
+    if '<' not in html_fragment:
+        return html_fragment.strip()
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html_fragment, 'html.parser')
+    # Space out block elements only, so inline markup doesn't split words from their punctuation
+    for tag in soup.find_all(BLOCK_TAGS):
+        tag.insert_after(' ')
+    return ' '.join(soup.get_text().split())
+
+
+def page_title(soup: 'BeautifulSoup') -> str:
+    return soup.title.string.strip() if soup.title and soup.title.string else ""
+
+
+@dataclass
+class ReducedPage:
+    """Reduced page text along with its token accounting."""
+    text: str
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+class HTMLReducer:
+    def __init__(self, max_tokens: int = 3000):
+        self.max_tokens = max_tokens
+
+    def reduce(self, html_content: str) -> ReducedPage:
+        return self.reduce_soup(parse_html(html_content), estimate_tokens(html_content))
+
+    def reduce_soup(self, soup: 'BeautifulSoup', tokens_before: int) -> ReducedPage:
+        """Reduce a page parsed by parse_html. The soup is modified, so read anything else from it first."""
+        title = page_title(soup)
+        root = self._main_content(soup)
+
+        # Collapse source whitespace, then put line breaks only around block elements
+        for node in root.find_all(string=True):
+            collapsed = re.sub(r'\s+', ' ', node)
+            if collapsed != node:
+                node.replace_with(collapsed)
+        for tag in root.find_all(BLOCK_TAGS):
+            tag.insert_before('\n')
+            tag.insert_after('\n')
+        for heading in root.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
+            heading.insert(0, '#' * int(heading.name[1]) + ' ')
+        for item in root.find_all('li'):
+            item.insert(0, '- ')
+
+        lines = (line.strip() for line in root.get_text().split('\n'))
+        text = '\n'.join(line for line in lines if line)
+        if title and title not in text:
+            text = f"Title: {title}\n{text}"
+
+        text = self._fit_to_budget(text)
+        return ReducedPage(text=text, tokens_before=tokens_before, tokens_after=estimate_tokens(text))
+
+    @staticmethod
+    def _main_content(soup: 'BeautifulSoup'):
+        for selector in MAIN_CONTENT_SELECTORS:
+            node = soup.select_one(selector)
+            if node is not None and node.get_text(strip=True):
+                return node
+        return soup.body or soup
+
+    def _fit_to_budget(self, text: str) -> str:
+        max_chars = self.max_tokens * CHARS_PER_TOKEN
+        if len(text) <= max_chars:
+            return text
+        cut = text.rfind('\n', 0, max_chars)
+        return text[:cut if cut > 0 else max_chars]
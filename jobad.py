@@ -11,3 +11,5 @@ class JobAd:
     company: str
     location: Optional[str] = None
     salary: Optional[str] = None
+    # URL of the listing this one is a near-duplicate of, whose extracted details it shares
+    duplicate_of: Optional[str] = None
@@ -1,145 +1,475 @@
 from webpagescraper import WebPageScraper
 from urlextractor import URLExtractor
-from urllib.parse import urljoin, urlparse
+from urltemplates import URLTemplates
+from urlchunker import DEFAULT_CHUNK_TOKENS, chunk_urls, dedupe_urls, map_chunks
+from llmclient import get_llm_client
+from frontier import CrawlFrontier, FrontierEntry, RobotsCache
+from atsdetector import ATSClient, detect_ats
+from careersprobe import CareersProber
+from batchextractor import BatchExtractor
+from crawlstate import DEFAULT_STATE_PATH, CrawlState, content_hash
+from neardup import NearDuplicateIndex
+from pagedocument import PageDocument, PageParser
+import structureddata
+from urllib.parse import urlparse
+from typing import Dict, List, Optional
 from jobad import JobAd
-import logging
+from jobstore import JobStore
+from metrics import metrics
+from collections import Counter
+from dataclasses import asdict
+import asyncio
 import csv
+import io
+import logging
+import queue
+import time
 
 logger = logging.getLogger(__name__)
 
 class JobCrawler:
-    def __init__(self, homepage_url):
+    def __init__(self, homepage_url, max_prompt_tokens=3000, heuristic_threshold=0.6, max_depth=3, max_pages=25,
+                 ats_feed_bases=None, max_batch_listings=8, max_batch_tokens=8000,
+                 state_path=DEFAULT_STATE_PATH, full_recrawl=False, near_duplicate_threshold=0,
+                 parse_workers=None, cache_max_bytes=None):
         self.homepage_url = homepage_url
+        self.company = urlparse(homepage_url).netloc
         self.crawl_url = ""
         self.job_page_url = ""
         self.job_urls = []
-        self.webpagescraper = WebPageScraper()
-        self.urlextractor = URLExtractor(homepage_url)
+        self.webpagescraper = WebPageScraper(cache_max_bytes=cache_max_bytes)
+        # Learned listing URL templates and near-duplicate fingerprints are kept with the crawl state
+        shared_path = state_path if state_path and not full_recrawl else ":memory:"
+        self.urlextractor = URLExtractor(homepage_url, templates=URLTemplates(shared_path), run=self.webpagescraper.run)
+        # One robots.txt check for crawled, LLM-picked and probed URLs alike
+        self.robots = RobotsCache(self.webpagescraper.fetcher)
+        self.careersprober = CareersProber(self.webpagescraper.fetcher, shared_path, robots=self.robots)
+        # Job listing pages are parsed once each, in a process pool unless parse_workers is 0
+        self.pageparser = PageParser(parse_workers, max_tokens=max_prompt_tokens,
+                                     signatures=bool(near_duplicate_threshold))
+        self.tokens_saved = 0
+        self.heuristic_threshold = heuristic_threshold
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.discovery_stats = Counter()
+        self.extraction_stats = Counter()
+        self.atsclient = ATSClient(self.webpagescraper.fetcher, feed_bases=ats_feed_bases)
+        self.ats_job_ads = []
+        self.max_batch_listings = max_batch_listings
+        self.batchextractor = BatchExtractor(get_llm_client(), max_batch_tokens=max_batch_tokens,
+                                             max_batch_listings=max_batch_listings)
+        # Remembered careers page and listing hashes; full_recrawl ignores them but still records
+        self.state = CrawlState(state_path) if state_path else None
+        self.full_recrawl = full_recrawl
+        self.careers_page_links = []
+        self.closed_urls = []
+        self.listing_hashes = {}
+        # Hashes of listings extracted this run, committed to the crawl state once their ads are saved
+        self.extracted_hashes = {}
+        self.known_hashes = {}
+        self.duplicates = None
+        if near_duplicate_threshold:
+            self.duplicates = NearDuplicateIndex(shared_path, threshold=near_duplicate_threshold)
 
     def find_job_page(self):
-        visited_urls = []
-        contains_job_listings = False # Verifies it's a careers page
-        company_domain = self.crawl_url.strip("https://")
-        while not contains_job_listings:
-            crawl_html = self.webscraper.get_html_content(self.crawl_url)
-            urls = self.urlextractor.get_urls_from_html_file(crawl_html, self.homepage_url)
-            self.job_page_url = extract_job_page_url(urls, blacklist=visited_urls)
-            if self.job_page_url is None or self.job_page_url in visited_urls:
-                self.job_page_url = None
-                # Attempt to find careers page via google
-                potential_career_urls = [
-                    f"https://{company_domain}/jobs",
-                    f"https://{company_domain}/careers",
-                    f"https://{company_domain}/work-with-us",
-                    f"https://{company_domain}/join-our-team",
-                    f"https://careers.{company_domain}",
-                ]
-
-                for url in potential_career_urls:
-                    if url not in visited_urls:
-                        career_page_html = self.webscraper.get_html_content(url)
-                        if career_page_html != "":
-                            self.job_page_url = url
-                            break
+        with metrics.tagged(stage='discover'), metrics.timer('stage_seconds'):
+            found = self.use_known_careers_page() or self._find_job_page()
+            if found and self.state is not None:
+                self.remember_listings()
+            return found
+
+    def use_known_careers_page(self) -> bool:
+        """Go straight to the careers page found last time, only classifying links that are new since then."""
+        if self.state is None or self.full_recrawl:
+            return False
+        known = self.state.careers_page(self.company)
+        if known is None:
+            return False
+        html_content = self.webpagescraper.get_html(known.url)
+        if not html_content:
+            logger.warning(f"⚠️ Known careers page {known.url} is unavailable, rediscovering")
+            return False
+        if self.use_ats_board(html_content, known.url):
+            return True
+
+        links = self.urlextractor.get_urls_from_html(html_content)
+        open_listings = self.state.listing_hashes(self.company)
+        still_listed = [url for url in links if url in open_listings]
+        new_links = [url for url in links if url not in known.links]
+        new_listings = self.urlextractor.find_job_listing_urls(new_links) if new_links else []
+        logger.info(f"♻️ Recrawling {known.url}: {len(still_listed)} known listings still up, "
+                    f"{len(new_links)} new links, {len(new_listings)} new listings")
+        if not still_listed and not new_listings:
+            logger.info("♻️ No known listings left on the careers page, rediscovering")
+            return False
+        self.discovery_stats['known'] += 1
+        self.job_page_url = known.url
+        self.careers_page_links = links
+        self.job_urls = list(dict.fromkeys(still_listed + new_listings))
+        return True
+
+    def use_listings(self, job_page_url: str, job_urls, known_hashes: Optional[Dict[str, str]] = None):
+        """Extract listings found by an earlier discovery, e.g. one run by another queue worker."""
+        self.job_page_url = job_page_url
+        self.job_urls = list(job_urls)
+        self.known_hashes = dict(known_hashes or {})
+
+    def remember_listings(self):
+        """Save the careers page and its listings, noting listings that are gone to be closed by commit_state."""
+        self.state.save_careers_page(self.company, self.job_page_url, self.careers_page_links)
+        self.known_hashes = {} if self.full_recrawl else self.state.listing_hashes(self.company)
+        self.closed_urls = self.state.missing_listings(self.company, self.job_urls)
+        self.state.add_listings(self.company, self.job_urls)
+
+    def commit_state(self):
+        """Record extracted listings and close removed ones; call once their job ads are written."""
+        if self.state is not None:
+            self.state.commit_extraction(self.company, self.extracted_hashes, self.closed_urls)
+
+    def _find_job_page(self):
+        frontier = CrawlFrontier(max_depth=self.max_depth, max_pages=self.max_pages,
+                                 robots=self.robots)
+        self.crawl_url = self.crawl_url or self.homepage_url
+        frontier.mark_visited(self.crawl_url)
+        depth = 0
+        while len(frontier.visited) < self.max_pages:
+            crawl_html = self.webpagescraper.get_html(self.crawl_url)
+            if self.use_ats_board(crawl_html, self.crawl_url):
+                return True
+            links = self.urlextractor.get_links_from_html(crawl_html)
+            frontier.add_links(links, depth + 1)
+            candidate = self.choose_job_page_url(frontier, links, depth)
+            if candidate is None:
+                # Fall back to conventional careers URLs, probed all at once
+                self.job_page_url = self.webpagescraper.run(self.careersprober.afind(self.homepage_url, skip=frontier.is_visited))
 
                 if self.job_page_url is None:
                     logger.error(f"❌ Cannot find job listings page for {self.homepage_url}")
                     return False
-                else:
-                    print(f"Found careers page via fabricated URL: {self.job_page_url}")
-
-            visited_urls.append(self.job_page_url)
+                self.discovery_stats['probe'] += 1
+                logger.info(f"🔎 [probe] Found careers page via conventional URL: {self.job_page_url}")
+                depth = 1
+            else:
+                self.job_page_url = candidate.url
+                depth = candidate.depth
+            frontier.mark_visited(self.job_page_url)
 
-            potential_job_listings_site = self.webscraper.get_html_content(self.job_page_url)
-            potential_listing_urls = self.urlextractor.get_urls_from_html_file(potential_job_listings_site, self.homepage_url)
+            potential_job_listings_site = self.webpagescraper.get_html(self.job_page_url)
+            if self.use_ats_board(potential_job_listings_site, self.job_page_url):
+                return True
+            potential_listing_urls = self.urlextractor.get_urls_from_html(potential_job_listings_site)
+            self.careers_page_links = potential_listing_urls
 
-            self.job_urls = self.urlextractor.get_urls_from_html_file(potential_listing_urls, blacklist=visited_urls)
+            self.job_urls = self.urlextractor.find_job_listing_urls(potential_listing_urls)
 
             if len(self.job_urls) > 0 and self.job_urls[0].lower() != "none":
-                contains_job_listings = True
-            elif self.job_page_url:
-                self.crawl_url = self.job_page_url
-            else:
-                logger.error(f"❌ Cannot find job listings page for {self.homepage_url}")
-                return False
+                return True
+            self.crawl_url = self.job_page_url
+
+        logger.error(f"❌ Crawl budget of {self.max_pages} pages spent without finding job listings for {self.homepage_url}")
+        return False
+
+    def choose_job_page_url(self, frontier: CrawlFrontier, links, depth: int) -> Optional[FrontierEntry]:
+        """Pick the likeliest careers page, only asking the LLM when the heuristic is unsure."""
+        best = frontier.peek()
+        if best is not None and best.score >= self.heuristic_threshold:
+            frontier.pop()
+            self.discovery_stats['heuristic'] += 1
+            logger.info(f"🎯 [heuristic] Picked careers page {best.url} (score {best.score:.2f} >= {self.heuristic_threshold}, depth {best.depth})")
+            return best
+
+        top = f"{best.url} ({best.score:.2f})" if best else "n/a"
+        logger.info(f"🤔 [heuristic] Best candidate {top} below {self.heuristic_threshold}, deferring to LLM")
+        self.discovery_stats['llm'] += 1
+        job_page_url = self.webpagescraper.run(aextract_job_page_url([url for url, _ in links], blacklist=frontier.visited))
+        if job_page_url is None or frontier.is_visited(job_page_url) or not frontier.allowed(job_page_url):
+            return None
+        logger.info(f"🤖 [llm] Picked careers page {job_page_url}")
+        return FrontierEntry(job_page_url, "", depth + 1, 0.0)
+
+    def use_ats_board(self, html_content: str, page_url: str) -> bool:
+        """If the page embeds a hosted ATS board, load every posting from its JSON feed."""
+        board = detect_ats(html_content)
+        if board is None:
+            return False
+        logger.info(f"🏷️ Found {board.provider} board '{board.token}' on {page_url}")
+        self.ats_job_ads = self.webpagescraper.run(self.atsclient.fetch_job_ads(board, self.company))
+        if not self.ats_job_ads:
+            return False
+        self.discovery_stats['ats'] += 1
+        self.job_page_url = page_url
+        self.job_urls = [job_ad.url for job_ad in self.ats_job_ads]
+        logger.info(f"✅ Loaded {len(self.ats_job_ads)} job ads from the {board.provider} feed, skipping crawl and LLM extraction")
         return True
 
+    def close(self):
+        """Release the LLM client's connections on this crawler's loop, then stop the loop."""
+        self.webpagescraper.run(get_llm_client().aclose())
+        self.webpagescraper.close()
+        self.pageparser.close()
+        self.urlextractor.templates.close()
+        self.careersprober.close()
+        if self.state is not None:
+            self.state.close()
+        if self.duplicates is not None:
+            self.duplicates.close()
+
     def save_job_page_url(self, careers_file):
         with open(careers_file, 'w') as f:
             f.write(self.job_page_url)
         logger.info(f"💾 Saved job page URL to file: {careers_file}")
 
-    def process_job_listings(self, output_file):
-        for job_url in self.job_urls:
-            logger.info(f"📄 Processing job listing: {job_url}")
-            job_html = self.webpagescraper.get_html(job_url)
-            job_info = self.extract_data_from_job_listing(job_html)
-            job_ad = JobAd(
-                url=job_url,
-                title=job_info['title'],
-                description=job_info['description'],
-                company=urlparse(self.homepage_url).netloc,
-                location=job_info['location'],
-                salary=job_info['salary']
-            )
-            self.write_to_csv(job_ad, output_file)
-
-    def extract_data_from_job_listing(self, html_content: str) -> dict:
-        """Use OpenAI to analyze the job listing HTML and extract job information."""
-        logger.info("🤖 Analyzing job listing HTML")
+    def process_job_listings(self, job_store: JobStore):
+        for job_ad in self.extract_job_ads():
+            job_store.add(job_ad)
+        job_store.mark_closed(self.closed_urls)
+        job_store.flush()
+        self.commit_state()
+
+    def extract_job_ads(self):
+        """Fetch and extract every job listing, yielding each JobAd as soon as it is ready."""
+        results = queue.Queue()
+
+        async def produce():
+            try:
+                async for job_ad in self.aextract_job_ads():
+                    results.put(job_ad)
+            finally:
+                results.put(None)
+
+        start = time.perf_counter()
+        with metrics.tagged(stage='extract'):
+            future = self.webpagescraper.submit(produce())
+        while (job_ad := results.get()) is not None:
+            yield job_ad
+        future.result()  # Re-raise anything that escaped the pipeline
+        with metrics.tagged(stage='extract'):
+            metrics.observe('stage_seconds', time.perf_counter() - start)
+        logger.info(f"🧾 Extraction paths: {dict(self.extraction_stats)}")
+        logger.info(f"✂️ HTML reduction saved ~{self.tokens_saved} prompt tokens")
+
+    async def aextract_job_ads(self):
+        """Fetch and extract all job listings concurrently, in completion order.
+
+        Listings with complete structured data are yielded as soon as they are
+        fetched. The rest go to the LLM as they arrive, packed into batches
+        when max_batch_listings > 1. Each batch is sent as soon as it is full,
+        and the last one once every fetch has finished. Near-duplicates of an
+        already extracted listing reuse its details, and near-duplicates of one
+        still being extracted wait for it.
+        """
+        if self.ats_job_ads:
+            for job_ad in self.ats_job_ads:
+                ats_content = f"{job_ad.title}\n{job_ad.description}\n{job_ad.location}\n{job_ad.salary}"
+                if not self._is_unchanged(job_ad.url, content_hash(ats_content)):
+                    yield self._record_job_ad(job_ad.url, asdict(job_ad), 'ats')
+            return
+        logger.info(f"🌐 Processing {len(self.job_urls)} job listings concurrently")
+        needs_llm: Dict[str, PageDocument] = {}
+        fetches = {asyncio.ensure_future(self._afetch_job_listing(job_url)) for job_url in self.job_urls}
+        # Extraction task -> whether listings it fails on get another try on their own
+        extractions: Dict[asyncio.Future, bool] = {}
+        batch: Dict[str, str] = {}
+        # Canonical listing URL -> near-duplicates waiting for its details
+        waiting: Dict[str, List[str]] = {}
+        canonical = set()
+
+        def extract(texts: Dict[str, str]):
+            extractions[asyncio.ensure_future(self._aextract(texts))] = len(texts) > 1
+
+        try:
+            while fetches or extractions:
+                done, _ = await asyncio.wait(set(fetches) | set(extractions), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task in fetches:
+                        fetches.remove(task)
+                        job_url, document = task.result()
+                        if document is None:
+                            continue
+                        if structureddata.is_complete(document.job_info):
+                            yield self._record_job_ad(job_url, document.job_info, 'structured')
+                            continue
+                        needs_llm[job_url] = document
+                        match = self._find_near_duplicate(job_url, document, canonical)
+                        if match is not None and match.job_info is not None:
+                            yield self._record_duplicate(job_url, match.url, match.job_info, document.job_info)
+                        elif match is not None:
+                            waiting.setdefault(match.url, []).append(job_url)
+                        elif self.max_batch_listings > 1:
+                            if not self.batchextractor.fits(batch, document.text):
+                                extract(batch)
+                                batch = {}
+                            batch[job_url] = document.text
+                            if self.batchextractor.is_full(batch):
+                                extract(batch)
+                                batch = {}
+                        else:
+                            extract({job_url: document.text})
+                        continue
+
+                    retry = extractions.pop(task)
+                    for job_url, llm_info in task.result().items():
+                        if llm_info is None and retry:
+                            logger.info(f"🔁 Retrying a listing the batched request could not extract: {job_url}")
+                            extract({job_url: needs_llm[job_url].text})
+                        elif llm_info is None:
+                            # A near-duplicate found from now on becomes canonical itself
+                            canonical.discard(job_url)
+                            orphans = waiting.pop(job_url, [])
+                            if orphans:
+                                logger.info(f"🔁 Extracting {len(orphans)} near-duplicates whose canonical listing failed")
+                            for orphan_url in orphans:
+                                extract({orphan_url: needs_llm[orphan_url].text})
+                        else:
+                            structured_info = needs_llm[job_url].job_info
+                            job_info = self._merge_structured(llm_info, structured_info)
+                            if self.duplicates is not None:
+                                self.duplicates.set_job_info(job_url, job_info)
+                            yield self._record_job_ad(job_url, job_info, 'structured+llm' if structured_info else 'llm')
+                            for duplicate_url in waiting.pop(job_url, []):
+                                yield self._record_duplicate(duplicate_url, job_url, job_info,
+                                                             needs_llm[duplicate_url].job_info)
+                if batch and not fetches:
+                    extract(batch)
+                    batch = {}
+        finally:
+            for task in [*fetches, *extractions]:
+                task.cancel()
+
+    @staticmethod
+    def _merge_structured(job_info: dict, structured_info: dict) -> dict:
+        """Structured values are authoritative; the LLM or canonical listing fills in what is missing."""
+        return {**job_info, **{key: value for key, value in structured_info.items() if value}}
+
+    def _find_near_duplicate(self, job_url: str, document: PageDocument, canonical: set):
+        """Return the indexed listing this one nearly duplicates, or None after indexing it as canonical.
+
+        Only listings with the same title (page title and first heading) can
+        match. A match without job info counts only if it is being extracted
+        in this run (it is in ``canonical``); otherwise its extraction failed
+        and this listing becomes the canonical one instead.
+        """
+        if self.duplicates is None:
+            return None
+        title = ' '.join([document.title] + document.headings[:1])
+        match = self.duplicates.find(document.signature, title, exclude=job_url)
+        if match is not None and (match.job_info is not None or match.url in canonical):
+            logger.info(f"👯 {job_url} is a near-duplicate of {match.url} ({match.similarity:.2f} similar)")
+            return match
+        self.duplicates.add(job_url, self.company, document.signature, title)
+        canonical.add(job_url)
+        return None
+
+    def _record_duplicate(self, job_url: str, canonical_url: str, canonical_info: dict, structured_info: dict) -> JobAd:
+        """Reuse the canonical listing's details, keeping this page's own structured values."""
+        job_ad = self._record_job_ad(job_url, self._merge_structured(canonical_info, structured_info), 'duplicate')
+        job_ad.duplicate_of = canonical_url
+        return job_ad
+
+    async def _afetch_job_listing(self, job_url: str):
+        """Fetch and parse a listing, returning (url, document); the document is None if there is nothing to extract."""
+        job_html = await self.webpagescraper.aget_html(job_url)
+        logger.info(f"📄 Processing job listing: {job_url}")
+        if not job_html:
+            logger.warning(f"⚠️ Skipping job listing with no content: {job_url}")
+            return job_url, None
+        # Hashed in the parse worker, which skips parsing when the listing is unchanged
+        listing_hash, document = await self.pageparser.aparse_listing(job_html, job_url, self.known_hashes.get(job_url))
+        if self._is_unchanged(job_url, listing_hash):
+            return job_url, None
+        self.tokens_saved += document.tokens_saved
+        logger.info(f"✂️ Reduced job listing to {document.tokens_after} tokens ({document.tokens_saved} saved)")
+        return job_url, document
+
+    async def _aextract(self, texts: Dict[str, str]) -> Dict[str, Optional[dict]]:
+        """Extract reduced listings in one LLM request, mapping each URL to its job info or None on failure."""
+        if len(texts) == 1:
+            (job_url, text), = texts.items()
+            try:
+                response = await get_llm_client().achat(messages=self._listing_messages(text))
+                return {job_url: self._parse_job_listing_response(response)}
+            except Exception:
+                logger.exception(f"💥 Failed to extract job listing: {job_url}")
+                return {job_url: None}
+        urls_by_id = {str(number): job_url for number, job_url in enumerate(texts, start=1)}
+        results = await self.batchextractor.extract({listing_id: texts[job_url] for listing_id, job_url in urls_by_id.items()})
+        return {urls_by_id[listing_id]: job_info for listing_id, job_info in results.items()}
+
+    def _is_unchanged(self, job_url: str, listing_hash: str) -> bool:
+        """Note a listing's content hash, returning True if it matches what was extracted last time."""
+        if self.state is None:
+            return False
+        self.listing_hashes[job_url] = listing_hash
+        if self.known_hashes.get(job_url) != listing_hash:
+            return False
+        self.extraction_stats['unchanged'] += 1
+        logger.info(f"⏭️ Job listing unchanged since last crawl, skipping: {job_url}")
+        return True
+
+    def _record_job_ad(self, job_url: str, job_info: dict, path: str) -> JobAd:
+        self.extraction_stats[path] += 1
+        logger.info(f"🧾 [{path}] Extracted job listing: {job_url}")
+        if job_url in self.listing_hashes:
+            self.extracted_hashes[job_url] = self.listing_hashes[job_url]
+        return self._make_job_ad(job_url, job_info)
+
+    def _make_job_ad(self, job_url: str, job_info: dict) -> JobAd:
+        return JobAd(
+            url=job_url,
+            title=job_info.get('title', ''),
+            description=job_info.get('description', ''),
+            company=self.company,
+            location=job_info.get('location'),
+            salary=job_info.get('salary')
+        )
+
+    def _listing_messages(self, text: str) -> List[dict]:
+        logger.info("🤖 Analyzing job listing")
         prompt = f"""
-        Analyze the following HTML content and extract job information.
-        Return the information in CSV format using the following template:
+        Analyze the following job listing page content and extract job information.
+        Return the information in CSV format using the following template, quoting any field that contains a comma:
         url,title,description,company,location,salary
 
         If you cannot find information for a field, leave it empty.
 
-        HTML content:
-        {html_content}
+        Page content:
+        {text}
         """
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        csv_data = response.choices[0].message.content.strip().split('\n')[1]  # Skip header
-        job_info = dict(zip(['url', 'title', 'description', 'company', 'location', 'salary'], csv_data.split(',')))
+        return [{"role": "user", "content": prompt}]
+
+    @staticmethod
+    def _parse_job_listing_response(response: str) -> dict:
+        fieldnames = ['url', 'title', 'description', 'company', 'location', 'salary']
+        # Parse as real CSV so quoted descriptions containing commas stay in one field
+        rows = [row for row in csv.reader(io.StringIO(response.strip())) if row]
+        if rows and [cell.strip().lower() for cell in rows[0]] == fieldnames:
+            rows = rows[1:]  # Skip header
+        job_info = dict(zip(fieldnames, rows[0])) if rows else {}
         logger.info(f"📊 Extracted job information: {job_info}")
         return job_info
 
-    def write_to_csv(self, job_ad: JobAd, filename: str):
-        """Write a job advertisement to a CSV file if it's not already present."""
-        logger.info(f"📝 Writing job ad to CSV: {filename}")
-        fieldnames = ['url', 'title', 'description', 'company', 'location', 'salary']
 
-        try:
-            with open(filename, 'r') as f:
-                existing_urls = [row['url'] for row in csv.DictReader(f)]
-        except FileNotFoundError:
-            existing_urls = []
-
-        if job_ad.url not in existing_urls:
-            with open(filename, 'a', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                if f.tell() == 0:
-                    writer.writeheader()
-                writer.writerow(job_ad.__dict__)
-            logger.info(f"✅ Job ad written to CSV: {job_ad.url}")
-        else:
-            logger.info(f"⏭️ Job ad already exists in CSV, skipping: {job_ad.url}")
-
-
-def extract_job_page_url(urls: List[str], blacklist=[]) -> Optional[str]:
-    """Use OpenAI to analyze the URLs and find the most likely job listings page."""
+async def aextract_job_page_url(urls: List[str], blacklist=(), chunk_tokens: int = DEFAULT_CHUNK_TOKENS) -> Optional[str]:
+    """Use OpenAI to analyze the URLs and find the most likely job listings page.
+
+    Each token-budgeted chunk of URLs nominates its best URL in parallel, and
+    when several chunks do, the LLM picks among the nominees.
+    """
     logger.info("🤖 Analyzing URLs to find job listings page")
+    chunks = chunk_urls(urls, chunk_tokens)
+    nominees = dedupe_urls(url for url in await map_chunks(lambda chunk: _apick_job_page_url(chunk, blacklist), chunks) if url)
+    if len(nominees) > 1:
+        logger.info(f"🧩 {len(nominees)} chunks nominated a careers page, picking between them")
+        nominees = [url for url in [await _apick_job_page_url(nominees, blacklist)] if url]
+    if nominees:
+        logger.info(f"✅ Identified job listings page: {nominees[0]}")
+        return nominees[0]
+    logger.warning("❌ Could not identify job listings page")
+    return None
+
+
+async def _apick_job_page_url(urls: List[str], blacklist) -> Optional[str]:
     prompt = f"Given the following list of URLs, give me the one URL that is most likely to contain the company's job listings. You must only respond with the URL, nothing else. The URL must not be an exact match to any urls in the following blacklist although if it's similar, that is allowed.: [{blacklist}\nIf you are not sure, simply say \"None\":\n\n" + "\n".join(urls)
-    response = openai.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}]
-    )
-    job_page_url = response.choices[0].message.content.strip()
-    if job_page_url.lower() != 'none':
-        logger.info(f"✅ Identified job listings page: {job_page_url}")
-        return job_page_url
-    else:
-        logger.warning("❌ Could not identify job listings page")
-        return None
+    response = await get_llm_client().achat(messages=[{"role": "user", "content": prompt}])
+    job_page_url = response.strip()
+    return None if job_page_url.lower() == 'none' else job_page_url
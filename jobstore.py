@@ -0,0 +1,177 @@
+""" Indexed, batched storage for extracted job ads with CSV export """
+import csv
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import asdict, fields
+from typing import Iterable, List, Optional
+
+from jobad import JobAd
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+FIELDNAMES = [field.name for field in fields(JobAd)]
+
+
+class JobStore:
+    """Stores job ads in SQLite with the URL as a unique key.
+
+    Ads are buffered and committed in batches; every newly inserted ad is
+    also appended to ``csv_path`` so the CSV output stays compatible. Ads
+    whose URL is already stored update the row if their content changed, and
+    listings that disappear are marked closed. Either rewrites the CSV from
+    the open rows on close. The database defaults to the CSV path with a
+    ``.db`` extension and is seeded from an existing CSV the first time it
+    is created.
+    """
+
+    def __init__(self, csv_path: str, db_path: Optional[str] = None, batch_size: int = 100):
+        self.csv_path = csv_path
+        self.db_path = db_path or os.path.splitext(csv_path)[0] + '.db'
+        self.batch_size = batch_size
+        self.written = 0
+        self.updated = 0
+        self.closed = 0
+        self._pending: List[JobAd] = []
+
+        is_new = not os.path.exists(self.db_path)
+        self._db = sqlite3.connect(self.db_path, timeout=30)
+        columns = ', '.join(f"{name} TEXT" for name in FIELDNAMES[1:])
+        self._db.execute(f"CREATE TABLE IF NOT EXISTS jobs (url TEXT PRIMARY KEY, {columns}, added_at REAL, closed_at REAL)")
+        existing = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if 'closed_at' not in existing:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN closed_at REAL")
+        for name in FIELDNAMES[1:]:
+            if name not in existing:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {name} TEXT")
+        self._db.commit()
+        if is_new:
+            self._import_csv()
+        if self._csv_header() not in (None, FIELDNAMES):
+            # Written before a column was added; appending would misalign the rows
+            self.export_csv()
+        self._urls = {row[0] for row in self._db.execute("SELECT url FROM jobs")}
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._urls
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, job_ad: JobAd) -> bool:
+        """Queue a job ad for writing; returns False if its URL is already stored.
+
+        Already stored ads are still queued, so the row is updated if the
+        listing changed.
+        """
+        is_new = job_ad.url not in self._urls
+        if not is_new:
+            logger.info(f"🔁 Job ad already stored, updating if changed: {job_ad.url}")
+        self._urls.add(job_ad.url)
+        self._pending.append(job_ad)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        return is_new
+
+    def flush(self):
+        """Commit buffered ads and append the newly inserted ones to the CSV."""
+        if not self._pending:
+            return
+        now = time.time()
+        inserted, updated = [], 0
+        placeholders = ', '.join('?' * (len(FIELDNAMES) + 1))
+        assignments = ', '.join(f"{name} = ?" for name in FIELDNAMES[1:])
+        changed = ' OR '.join(f"{name} IS NOT ?" for name in FIELDNAMES[1:])
+        for job_ad in self._pending:
+            row = asdict(job_ad)
+            values = [row[name] for name in FIELDNAMES[1:]]
+            # Another process may have stored the same URL since we loaded the index
+            cursor = self._db.execute(
+                f"INSERT OR IGNORE INTO jobs ({', '.join(FIELDNAMES)}, added_at) VALUES ({placeholders})",
+                [row[name] for name in FIELDNAMES] + [now],
+            )
+            if cursor.rowcount:
+                inserted.append(row)
+                metrics.inc('jobs_written_total', company=row['company'] or '')
+                continue
+            cursor = self._db.execute(
+                f"UPDATE jobs SET {assignments}, closed_at = NULL WHERE url = ? AND ({changed} OR closed_at IS NOT NULL)",
+                values + [job_ad.url] + values,
+            )
+            if cursor.rowcount:
+                updated += 1
+                metrics.inc('jobs_updated_total', company=row['company'] or '')
+        self._db.commit()
+        self._pending = []
+
+        if inserted:
+            self._append_csv(inserted)
+        self.written += len(inserted)
+        self.updated += updated
+        logger.info(f"✅ Committed {len(inserted)} new and {updated} changed job ads to {self.db_path}")
+
+    def mark_closed(self, urls: Iterable[str]) -> int:
+        """Mark stored job ads as closed, e.g. when they disappear from the careers page."""
+        self.flush()
+        now = time.time()
+        cursor = self._db.executemany(
+            "UPDATE jobs SET closed_at = ? WHERE url = ? AND closed_at IS NULL", [(now, url) for url in urls]
+        )
+        self._db.commit()
+        closed = max(cursor.rowcount, 0)
+        self.closed += closed
+        if closed:
+            logger.info(f"🗄️ Marked {closed} job ads closed in {self.db_path}")
+        return closed
+
+    def export_csv(self, path: Optional[str] = None):
+        """Rewrite the CSV from the job table, leaving out closed listings."""
+        self.flush()
+        path = path or self.csv_path
+        rows = self._db.execute(f"SELECT {', '.join(FIELDNAMES)} FROM jobs WHERE closed_at IS NULL ORDER BY added_at").fetchall()
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(FIELDNAMES)
+            writer.writerows(rows)
+        logger.info(f"📤 Exported {len(rows)} open job ads to {path}")
+
+    def close(self):
+        self.flush()
+        if self.updated or self.closed:
+            # Appending can't express changed or closed rows, so rewrite the CSV
+            self.export_csv()
+        self._db.close()
+
+    def _append_csv(self, rows: List[dict]):
+        with open(self.csv_path, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+            if f.tell() == 0:
+                writer.writeheader()
+            writer.writerows(rows)
+
+    def _csv_header(self) -> Optional[List[str]]:
+        try:
+            with open(self.csv_path, 'r', newline='') as f:
+                return next(csv.reader(f), None)
+        except FileNotFoundError:
+            return None
+
+    def _import_csv(self):
+        """Seed a new database from a CSV written by an earlier run."""
+        try:
+            with open(self.csv_path, 'r', newline='') as f:
+                rows = [[row.get(name) for name in FIELDNAMES] + [0] for row in csv.DictReader(f)]
+        except FileNotFoundError:
+            return
+        placeholders = ', '.join('?' * (len(FIELDNAMES) + 1))
+        self._db.executemany(f"INSERT OR IGNORE INTO jobs ({', '.join(FIELDNAMES)}, added_at) VALUES ({placeholders})", rows)
+        self._db.commit()
+        logger.info(f"📥 Imported {len(rows)} existing job ads from {self.csv_path}")
@@ -0,0 +1,56 @@
+""" Fast, anchor-only link extraction that avoids building a full parse tree """
+import html
+import re
+from typing import List, NamedTuple
+from urllib.parse import urljoin, urlparse
+
+from urlutils import canonicalize_url, is_same_site
+
+# Regions whose contents can contain '<a' but are never real links
+SKIP_RE = re.compile(r'<!--.*?-->|<(script|style|template|noscript)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+HREF_ATTR = r'\bhref\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))'
+ANCHOR_RE = re.compile(r'<a\s[^>]*?' + HREF_ATTR + r'[^>]*>', re.IGNORECASE)
+BASE_RE = re.compile(r'<base\s[^>]*?' + HREF_ATTR, re.IGNORECASE)
+ANCHOR_END_RE = re.compile(r'</a\s*>|<a[\s>]', re.IGNORECASE)
+TAG_RE = re.compile(r'<[^>]*>')
+
+
+class Link(NamedTuple):
+    url: str
+    text: str
+
+
+def extract_links(html_content: str, base_url: str, same_site: bool = True) -> List[Link]:
+    """Return unique, canonical links found in the HTML, in document order.
+
+    Only anchor tags are scanned: each href is resolved against the page URL
+    (or its <base href>), canonicalized, optionally restricted to the same
+    site and deduplicated in a single pass.
+    """
+    content = SKIP_RE.sub('', html_content)
+    base = BASE_RE.search(content)
+    if base:
+        base_url = urljoin(base_url, html.unescape(next(group for group in base.groups() if group is not None)))
+
+    links = {}
+    seen_hrefs = set()
+    for match in ANCHOR_RE.finditer(content):
+        raw_href = next(group for group in match.groups() if group is not None)
+        # Menus repeat the same hrefs; skip them before the comparatively costly URL handling
+        if raw_href in seen_hrefs:
+            continue
+        seen_hrefs.add(raw_href)
+
+        url = urljoin(base_url, html.unescape(raw_href).strip())
+        if urlparse(url).scheme not in ('http', 'https'):
+            continue
+        if same_site and not is_same_site(url, base_url):
+            continue
+        url = canonicalize_url(url)
+        if url in links:
+            continue
+
+        end = ANCHOR_END_RE.search(content, match.end())
+        text = content[match.end():end.start() if end else len(content)]
+        links[url] = ' '.join(html.unescape(TAG_RE.sub(' ', text)).split())
+    return [Link(url, text) for url, text in links.items()]
@@ -0,0 +1,44 @@
+""" Scores links by how likely they are to lead to a company's job listings """
+import re
+from urllib.parse import urlparse
+
+JOB_KEYWORDS = ['job', 'career', 'employment', 'vacancy', 'vacancies', 'position', 'opportunity', 'hiring', 'recruit']
+STRONG_PATH_SEGMENTS = {'careers', 'career', 'jobs', 'vacancies', 'join-us', 'joinus', 'work-with-us', 'join-our-team',
+                        'opportunities', 'open-positions', 'openings', 'hiring'}
+STRONG_ANCHOR_TEXT = {'careers', 'jobs', 'join us', 'join our team', 'work with us', 'work for us', 'vacancies',
+                      "we're hiring", 'we are hiring', 'open positions', 'current openings', 'job openings'}
+CAREER_SUBDOMAINS = ('careers.', 'jobs.', 'work.', 'join.')
+NEGATIVE_PATTERNS = re.compile(r'\.(pdf|jpe?g|png|gif|zip|docx?)$|/(blog|news|press|article|privacy|cookie)', re.IGNORECASE)
+
+
+def score_link(url: str, text: str = "") -> float:
+    """Score a link between 0 and 1 using its URL path, host and anchor text."""
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https'):
+        return 0.0
+
+    path = parsed.path.lower()
+    segments = [segment for segment in path.split('/') if segment]
+    anchor = ' '.join(text.lower().split())
+    score = 0.0
+
+    if any(segment in STRONG_PATH_SEGMENTS for segment in segments):
+        score += 0.5
+    elif any(keyword in path for keyword in JOB_KEYWORDS):
+        score += 0.25
+
+    if (parsed.hostname or '').lower().startswith(CAREER_SUBDOMAINS):
+        score += 0.5
+
+    if anchor in STRONG_ANCHOR_TEXT:
+        score += 0.4
+    elif any(keyword in anchor for keyword in JOB_KEYWORDS):
+        score += 0.2
+
+    if NEGATIVE_PATTERNS.search(path):
+        score -= 0.3
+    # Deep paths are more often individual articles than the careers hub
+    score -= 0.05 * max(0, len(segments) - 2)
+
+    return max(0.0, min(1.0, score))
+
@@ -0,0 +1,263 @@
+""" Shared OpenAI chat client with a persistent completion cache """
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from htmlreducer import estimate_tokens
+from metrics import metrics
+from ratelimiter import RateLimiter
+
+if TYPE_CHECKING:
+    import openai
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+DEFAULT_COMPLETION_TOKENS = 500
+MAX_RATE_LIMIT_RETRIES = 6
+MAX_TRANSIENT_RETRIES = 3
+
+
+class LLMClient:
+    """Wraps chat completions and memoizes them on disk.
+
+    Completions are keyed by a hash of the model, request parameters and
+    messages. Entries older than ``ttl`` seconds are ignored, and the least
+    recently used entries are evicted once the cache exceeds ``max_bytes``.
+    Async requests are scheduled through a RateLimiter so concurrent callers
+    stay within the account's requests- and tokens-per-minute limits.
+    """
+
+    def __init__(self, cache_path: str = "LLM_Cache/completions.db", ttl: float = 30 * 86400,
+                 max_bytes: int = 256 * 1024 * 1024, enabled: bool = True,
+                 rate_limiter: Optional[RateLimiter] = None):
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self._async_client: Optional['openai.AsyncOpenAI'] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def chat(self, messages: List[Dict[str, str]], model: str = DEFAULT_MODEL, **params) -> str:
+        """Return the content of a chat completion, from cache when possible."""
+        key = self._make_key(model, messages, params)
+        cached = self._get(key)
+        if cached is not None:
+            self._count_cache('hit', model)
+            return cached
+
+        self._count_cache('miss', model)
+        openai = _openai()
+        start = time.perf_counter()
+        response = openai.chat.completions.create(model=model, messages=messages, **params)
+        self._record_usage(model, response, time.perf_counter() - start)
+        content = response.choices[0].message.content or ""
+        self._put(key, model, content)
+        return content
+
+    async def achat(self, messages: List[Dict[str, str]], model: str = DEFAULT_MODEL, **params) -> str:
+        """Async chat completion, scheduled within the rate limits.
+
+        429s are retried after backing off the rate limiter; connection errors,
+        timeouts and server errors are retried with exponential backoff.
+        """
+        key = self._make_key(model, messages, params)
+        cached = self._get(key)
+        if cached is not None:
+            self._count_cache('hit', model)
+            return cached
+
+        self._count_cache('miss', model)
+        openai = _openai()
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            # The connection pool belongs to one loop and batch workers use a fresh loop per company.
+            # Retries are handled here so 429s feed back into the rate limiter and transient errors back off
+            self._async_loop = loop
+            self._async_client = openai.AsyncOpenAI(api_key=openai.api_key, max_retries=0)
+        prompt_tokens = sum(estimate_tokens(message['content']) for message in messages)
+        tokens = prompt_tokens + params.get('max_tokens', DEFAULT_COMPLETION_TOKENS)
+
+        rate_limited = failures = 0
+        while True:
+            with metrics.timer('llm_queue_seconds', model=model):
+                await self.rate_limiter.acquire(tokens)
+            start = time.perf_counter()
+            try:
+                response = await self._async_client.chat.completions.create(model=model, messages=messages, **params)
+            except openai.RateLimitError as e:
+                self.stats['rate_limited'] += 1
+                metrics.inc('llm_rate_limited_total', model=model)
+                if rate_limited == MAX_RATE_LIMIT_RETRIES:
+                    raise
+                rate_limited += 1
+                self.rate_limiter.on_rate_limited(_retry_after(e))
+                continue
+            except (openai.APIConnectionError, openai.InternalServerError) as e:
+                # APITimeoutError is a kind of APIConnectionError
+                metrics.inc('llm_errors_total', model=model, error=type(e).__name__)
+                if failures == MAX_TRANSIENT_RETRIES:
+                    raise
+                failures += 1
+                delay = min(2 ** failures, 30) * random.uniform(0.5, 1.0)
+                logger.warning(f"⚠️ {type(e).__name__} from {model}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            finally:
+                self.rate_limiter.release()
+            self.rate_limiter.on_success()
+            self._record_usage(model, response, time.perf_counter() - start)
+            content = response.choices[0].message.content or ""
+            self._put(key, model, content)
+            return content
+
+    async def aclose(self):
+        """Close the async client's connections; call on the loop that used it, before it stops."""
+        if self._async_client is not None and self._async_loop is asyncio.get_running_loop():
+            await self._async_client.close()
+            self._async_client = self._async_loop = None
+
+    def _count_cache(self, result: str, model: str):
+        self.stats[result] += 1
+        metrics.inc('llm_cache_total', result=result, model=model)
+
+    @staticmethod
+    def _record_usage(model: str, response, seconds: float):
+        metrics.observe('llm_seconds', seconds, model=model)
+        metrics.inc('llm_requests_total', model=model)
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            metrics.inc('llm_prompt_tokens_total', usage.prompt_tokens or 0, model=model)
+            metrics.inc('llm_completion_tokens_total', usage.completion_tokens or 0, model=model)
+
+    @staticmethod
+    def _make_key(model: str, messages: List[Dict[str, str]], params: dict) -> str:
+        payload = json.dumps({'model': model, 'params': params, 'messages': messages}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+            self._db = sqlite3.connect(self.cache_path, timeout=30, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                "key TEXT PRIMARY KEY, model TEXT, content TEXT, size INTEGER, "
+                "created_at REAL, accessed_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS completions_accessed ON completions (accessed_at)")
+            # Running total of the entries' sizes, kept by triggers so every process sharing the file agrees.
+            # It starts from the existing entries when an older cache is first opened
+            self._db.execute("CREATE TABLE IF NOT EXISTS cache_size (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER)")
+            self._db.execute("INSERT OR IGNORE INTO cache_size SELECT 0, COALESCE(SUM(size), 0) FROM completions")
+            self._db.execute("CREATE TRIGGER IF NOT EXISTS completions_added AFTER INSERT ON completions "
+                             "BEGIN UPDATE cache_size SET total = total + NEW.size; END")
+            self._db.execute("CREATE TRIGGER IF NOT EXISTS completions_removed AFTER DELETE ON completions "
+                             "BEGIN UPDATE cache_size SET total = total - OLD.size; END")
+            self._db.commit()
+        return self._db
+
+    def _get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            db = self._connect()
+            row = db.execute("SELECT content, created_at FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            content, created_at = row
+            now = time.time()
+            if now - created_at > self.ttl:
+                db.execute("DELETE FROM completions WHERE key = ?", (key,))
+                db.commit()
+                self.stats['expired'] += 1
+                return None
+            db.execute("UPDATE completions SET accessed_at = ? WHERE key = ?", (now, key))
+            db.commit()
+            return content
+
+    def _put(self, key: str, model: str, content: str):
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            # Delete, then insert, rather than INSERT OR REPLACE, whose implicit delete skips triggers
+            db.execute("DELETE FROM completions WHERE key = ?", (key,))
+            db.execute(
+                "INSERT INTO completions VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, content, len(content.encode('utf-8')), now, now),
+            )
+            self._evict(db)
+            db.commit()
+
+    def _evict(self, db: sqlite3.Connection):
+        """Drop least recently used entries once the cache outgrows max_bytes."""
+        total = db.execute("SELECT total FROM cache_size").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Go a little below the cap, so the next few puts don't each evict again
+        target = self.max_bytes * 0.9
+        while total > target:
+            rows = db.execute("SELECT key, size FROM completions ORDER BY accessed_at LIMIT 64").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if total <= target:
+                    break
+                db.execute("DELETE FROM completions WHERE key = ?", (key,))
+                total -= size
+                self.stats['evicted'] += 1
+
+    def summary(self) -> str:
+        hits, misses = self.stats['hit'], self.stats['miss']
+        total = hits + misses
+        rate = (hits / total * 100) if total else 0.0
+        return f"{hits} hits, {misses} misses ({rate:.0f}% hit rate)"
+
+
+@lru_cache(maxsize=None)
+def load_env():
+    """Load variables from a .env file once, if python-dotenv is installed."""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+def _openai():
+    """Import openai on first request; it is slow to import and cache hits never need it."""
+    load_env()
+    import openai
+    return openai
+
+
+def _retry_after(error: 'openai.RateLimitError') -> Optional[float]:
+    try:
+        return float(error.response.headers.get('retry-after'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+_default_client: Optional[LLMClient] = None
+
+
+def get_llm_client() -> LLMClient:
+    """Return the process-wide LLMClient, creating it on first use."""
+    global _default_client
+    if _default_client is None:
+        _default_client = LLMClient()
+    return _default_client
@@ -1,59 +1,109 @@
-import csv
 import argparse
-from typing import List, Optional
-import openai
-from urllib.parse import urlparse, urljoin
-import requests
+from urllib.parse import urlparse
 import logging
 import os
-from bs4 import BeautifulSoup
-from dotenv import load_dotenv
-import hashlib
-import time
-import json
 from jobcrawler import JobCrawler
-load_dotenv()
+from jobstore import JobStore
+from batchrunner import BatchRunner, QueueRunner, careers_file_for, read_homepages
+from llmclient import get_llm_client, load_env
+from metrics import metrics
+from workqueue import WorkQueue
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-JINA_API_KEY = os.environ.get('JINAAI_API_KEY')
 JINA_READ_URL = "https://r.jina.ai/"
 
-# Set your OpenAI API key
-openai.api_key = os.environ.get("OPENAI_API_KEY")
 
-if openai.api_key is None:
-    logging.warning("No OpenAI API key provided...")
-    exit(0)
-
-
-def process_company(homepage_url: str, output_file: str):
+def process_company(homepage_url: str, output_file: str, **crawler_options):
     """Process a company to find and extract job listings."""
     logger.info(f"🏢 Attempting to scrape job ads from: {homepage_url}")
 
-    # Create a folder called "Job Ads" if it doesn't exist
-    careers_folder = "Job Ads"
-    os.makedirs(careers_folder, exist_ok=True)
+    # Generate a filename in "Job Ads" based on the homepage URL
+    careers_file = careers_file_for(homepage_url)
+    crawler = JobCrawler(homepage_url, **crawler_options)
 
-    # Generate a filename based on the homepage URL
-    crawler = JobCrawler(homepage_url)
-
-    if crawler.find_job_page():
-        crawler.save_job_page_url(careers_file)
-        crawler.process_job_listings(output_file)
-        logger.info("✨ Job extraction process completed")
-    else:
-        logger.error("Failed to find job listings. Exiting.")
+    try:
+        with metrics.tagged(company=urlparse(homepage_url).netloc), metrics.timer('company_seconds'):
+            if crawler.find_job_page():
+                crawler.save_job_page_url(careers_file)
+                with JobStore(output_file) as job_store:
+                    crawler.process_job_listings(job_store)
+                logger.info("✨ Job extraction process completed")
+            else:
+                logger.error("Failed to find job listings. Exiting.")
+    finally:
+        crawler.close()
+        logger.info(f"🧭 Careers page decisions: {dict(crawler.discovery_stats)}")
+        logger.info(f"🧠 LLM cache: {get_llm_client().summary()}")
 
 def main():
     parser = argparse.ArgumentParser(description="Extract job listings for a company")
-    parser.add_argument("homepage_url", help="URL of the company's homepage")
+    parser.add_argument("homepage_url", nargs="?", help="URL of the company's homepage")
     parser.add_argument("--output", default="job_listings.csv", help="Output CSV file name")
+    parser.add_argument("--max-prompt-tokens", type=int, default=3000, help="Token budget for each job page sent to the LLM")
+    parser.add_argument("--heuristic-threshold", type=float, default=0.6, help="Link score (0-1) above which the careers page is picked without asking the LLM")
+    parser.add_argument("--max-depth", type=int, default=3, help="Maximum link hops from the homepage when looking for the careers page")
+    parser.add_argument("--max-pages", type=int, default=25, help="Maximum pages visited per company when looking for the careers page")
+    parser.add_argument("--listings-per-request", type=int, default=8, help="Job listings packed into each LLM extraction request (1 disables batching)")
+    parser.add_argument("--near-duplicate-threshold", type=float, default=0, help="Similarity (0-1, e.g. 0.8) above which a listing with the same title reuses an already extracted near-duplicate instead of asking the LLM (default 0: off)")
+    parser.add_argument("--parse-workers", type=int, help="Processes used to parse job listing pages (default: one per CPU, or 0 in batch mode where companies already run one process each; 0 parses in a thread)")
+    parser.add_argument("--cache-max-mb", type=float, help="Evict the least recently fetched pages once the compressed HTML cache outgrows this size (default: unbounded)")
+    parser.add_argument("--batch", metavar="FILE", help="Crawl every homepage listed in FILE, one per line ('-' for stdin)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of companies crawled in parallel in batch mode")
+    parser.add_argument("--queue", metavar="DB", help="Shared SQLite work queue. With --batch, the homepages are queued first; without, this process joins the workers draining it")
+    parser.add_argument("--lease-seconds", type=float, default=300, help="How long a queued task stays leased to a worker without a heartbeat before others may take it over")
+    parser.add_argument("--checkpoint", help="Checkpoint file used to resume batch runs (default: <output>.checkpoint)")
+    parser.add_argument("--state", default="Crawl_State/state.db", help="Crawl state database used for incremental recrawls ('' disables)")
+    parser.add_argument("--full-recrawl", action="store_true", help="Rediscover careers pages and re-extract every listing, ignoring saved state")
+    parser.add_argument("--metrics", metavar="FILE", help="Record per-stage metrics and write a JSON summary to FILE (plus Prometheus text as .prom)")
     args = parser.parse_args()
 
-    process_company(args.homepage_url, args.output)
+    # Set up logging
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    load_env()
+    if not os.environ.get("OPENAI_API_KEY"):
+        logger.warning("No OpenAI API key provided, only cached LLM completions will be available")
+
+    if args.metrics:
+        # Set in the environment too so batch workers record metrics
+        os.environ['SCROUNGER_METRICS'] = '1'
+        metrics.enable()
+    crawler_options = {
+        'max_prompt_tokens': args.max_prompt_tokens,
+        'heuristic_threshold': args.heuristic_threshold,
+        'max_depth': args.max_depth,
+        'max_pages': args.max_pages,
+        'max_batch_listings': args.listings_per_request,
+        'state_path': args.state or None,
+        'full_recrawl': args.full_recrawl,
+        'near_duplicate_threshold': args.near_duplicate_threshold,
+        'parse_workers': args.parse_workers if args.parse_workers is not None or not (args.batch or args.queue) else 0,
+        'cache_max_bytes': int(args.cache_max_mb * (1 << 20)) if args.cache_max_mb else None,
+    }
+
+    if args.queue:
+        work_queue = WorkQueue(args.queue, lease_seconds=args.lease_seconds)
+        runner = QueueRunner(args.output, work_queue, workers=args.workers, crawler_options=crawler_options)
+        if args.batch:
+            runner.enqueue(read_homepages(args.batch))
+        runner.run()
+        work_queue.close()
+    elif args.batch:
+        runner = BatchRunner(
+            args.output,
+            args.checkpoint or f"{args.output}.checkpoint",
+            workers=args.workers,
+            crawler_options=crawler_options,
+        )
+        runner.run(read_homepages(args.batch))
+    elif args.homepage_url:
+        process_company(args.homepage_url, args.output, **crawler_options)
+    else:
+        parser.error("a homepage_url, --batch FILE or --queue DB is required")
+
+    if args.metrics:
+        metrics.write(args.metrics)
+        logger.info(f"📈 Wrote metrics to {args.metrics}")
 
 if __name__ == "__main__":
     main()
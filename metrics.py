@@ -0,0 +1,262 @@
+""" Per-stage crawl metrics tagged by company, exported as JSON or Prometheus text """
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Tuple
+
+# Labels applied to everything recorded in the current context. They follow work
+# onto the fetch loop because AsyncFetcher.submit runs coroutines in the caller's context.
+_labels: contextvars.ContextVar[Tuple[Tuple[str, str], ...]] = contextvars.ContextVar('metric_labels', default=())
+
+# Histogram buckets in seconds for Prometheus output
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+MAX_SAMPLES = 2048
+
+SeriesKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class Histogram:
+    """Count, sum and bucket counts, plus a bounded reservoir of samples for percentiles."""
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.samples: List[float] = []
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        for index, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[index] += 1
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(value)
+        else:
+            slot = random.randrange(self.count)
+            if slot < MAX_SAMPLES:
+                self.samples[slot] = value
+
+    def merge(self, other: 'Histogram'):
+        total = self.count + other.count
+        if len(self.samples) + len(other.samples) > MAX_SAMPLES and total:
+            # Keep each side's share of the reservoir in proportion to its count
+            keep = round(MAX_SAMPLES * self.count / total)
+            self.samples = random.sample(self.samples, min(keep, len(self.samples))) + \
+                random.sample(other.samples, min(MAX_SAMPLES - keep, len(other.samples)))
+        else:
+            self.samples = self.samples + other.samples
+        self.count = total
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+    def percentile(self, pct: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+    def summary(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'p50': round(self.percentile(50), 6),
+            'p95': round(self.percentile(95), 6),
+            'max': round(self.max, 6),
+        }
+
+
+class Metrics:
+    """Counters and histograms keyed by name and labels.
+
+    ``company`` and ``stage`` labels come from the enclosing ``tagged`` block,
+    so call sites only name what they measure. When disabled every method
+    returns immediately, so instrumentation can stay in hot paths.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.started_at = time.time()
+        self._counters: Dict[SeriesKey, float] = defaultdict(float)
+        self._histograms: Dict[SeriesKey, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def enable(self, enabled: bool = True):
+        self.enabled = enabled
+
+    @contextmanager
+    def tagged(self, **labels: str) -> Iterator[None]:
+        """Apply labels (e.g. company, stage) to everything recorded inside the block."""
+        if not self.enabled:
+            yield
+            return
+        merged = dict(_labels.get())
+        merged.update({key: str(value) for key, value in labels.items()})
+        token = _labels.set(tuple(sorted(merged.items())))
+        try:
+            yield
+        finally:
+            _labels.reset(token)
+
+    def inc(self, name: str, value: float = 1, **labels: str):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] += value
+
+    def observe(self, name: str, value: float, **labels: str):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def timer(self, name: str, **labels: str):
+        """Context manager observing the block's duration in seconds."""
+        if not self.enabled:
+            return nullcontext()
+        return self._timer(name, labels)
+
+    @contextmanager
+    def _timer(self, name: str, labels: dict) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> SeriesKey:
+        if labels:
+            merged = dict(_labels.get())
+            merged.update({key: str(value) for key, value in labels.items()})
+            return name, tuple(sorted(merged.items()))
+        return name, _labels.get()
+
+    def drain(self) -> dict:
+        """Return everything recorded so far in a picklable form and start afresh.
+
+        Batch workers send this to the parent, which folds it in with ``merge``.
+        """
+        with self._lock:
+            state = {'counters': dict(self._counters), 'histograms': self._histograms}
+            self._counters = defaultdict(float)
+            self._histograms = {}
+        return state
+
+    def merge(self, state: dict):
+        with self._lock:
+            for key, value in state['counters'].items():
+                self._counters[key] += value
+            for key, histogram in state['histograms'].items():
+                if key in self._histograms:
+                    self._histograms[key].merge(histogram)
+                else:
+                    self._histograms[key] = histogram
+
+    def histogram(self, name: str, **labels: str) -> Histogram:
+        """Combine every series of a histogram whose labels include ``labels``."""
+        combined = Histogram()
+        with self._lock:
+            for (series, series_labels), histogram in self._histograms.items():
+                if series == name and labels.items() <= dict(series_labels).items():
+                    combined.merge(histogram)
+        return combined
+
+    def total(self, name: str, **labels: str) -> float:
+        with self._lock:
+            return sum(value for (series, series_labels), value in self._counters.items()
+                       if series == name and labels.items() <= dict(series_labels).items())
+
+    def summary(self) -> dict:
+        """JSON-friendly rollup: totals, time spent by stage, per-company breakdown and every series."""
+        with self._lock:
+            counters = list(self._counters.items())
+            histograms = list(self._histograms.items())
+
+        totals = defaultdict(float)
+        for (name, _), value in counters:
+            totals[name] += value
+        timings = defaultdict(Histogram)
+        by_stage = defaultdict(lambda: defaultdict(float))
+        by_company = defaultdict(lambda: defaultdict(float))
+        for (name, labels), histogram in histograms:
+            labels = dict(labels)
+            timings[name].merge(histogram)
+            by_stage[labels.get('stage', 'none')][name] += histogram.sum
+            if 'company' in labels:
+                by_company[labels['company']][name] += histogram.sum
+        for (name, labels), value in counters:
+            if 'company' in dict(labels):
+                by_company[dict(labels)['company']][name] += value
+
+        return {
+            'started_at': self.started_at,
+            'generated_at': time.time(),
+            'totals': dict(totals),
+            'timings': {name: histogram.summary() for name, histogram in sorted(timings.items())},
+            'seconds_by_stage': {stage: dict(values) for stage, values in sorted(by_stage.items())},
+            'by_company': {company: dict(values) for company, values in sorted(by_company.items())},
+            'series': [
+                {'name': name, 'labels': dict(labels), 'value': value} for (name, labels), value in counters
+            ] + [
+                {'name': name, 'labels': dict(labels), **histogram.summary()} for (name, labels), histogram in histograms
+            ],
+        }
+
+    def to_prometheus(self, prefix: str = 'scrounger_') -> str:
+        """Render every series in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+
+        lines, typed = [], set()
+        for (name, labels), value in counters:
+            metric = prefix + name
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+        for (name, labels), histogram in histograms:
+            metric = prefix + name
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            for bound, count in zip(BUCKETS, histogram.buckets):
+                lines.append(f"{metric}_bucket{_format_labels(labels + (('le', f'{bound:g}'),))} {count}")
+            lines.append(f"{metric}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str):
+        """Write the JSON summary to ``path`` and the Prometheus text next to it as ``.prom``."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+        with open(os.path.splitext(path)[0] + '.prom', 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    pairs = (f'{key}="' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+             for key, value in labels)
+    return '{' + ','.join(pairs) + '}'
+
+
+# Process-wide registry; batch workers inherit SCROUNGER_METRICS from the parent
+metrics = Metrics(enabled=os.environ.get('SCROUNGER_METRICS') == '1')
@@ -0,0 +1,148 @@
+""" MinHash fingerprints with banded LSH for spotting near-duplicate job listings """
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import struct
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r'\w+')
+SHINGLE_SIZE = 3
+NUM_PERM = 64
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+# Fixed permutation coefficients, so signatures stay comparable across processes and runs
+_COEFFICIENTS = [
+    struct.unpack('<QQ', hashlib.blake2b(f'perm-{i}'.encode(), digest_size=16).digest())
+    for i in range(NUM_PERM)
+]
+PERMUTATIONS = [(a % (MERSENNE_PRIME - 1) + 1, b % MERSENNE_PRIME) for a, b in _COEFFICIENTS]
+
+Signature = Tuple[int, ...]
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    """32-bit hashes of the overlapping word n-grams in the text, ignoring case and punctuation."""
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < size:
+        words = words + [''] * (size - len(words))
+    return {
+        int.from_bytes(hashlib.blake2b(' '.join(words[i:i + size]).encode('utf-8'), digest_size=4).digest(), 'little')
+        for i in range(len(words) - size + 1)
+    }
+
+
+def minhash(text: str) -> Signature:
+    """MinHash signature of the text's word shingles."""
+    hashes = shingles(text)
+    return tuple(min((a * h + b) % MERSENNE_PRIME & MAX_HASH for h in hashes) for a, b in PERMUTATIONS)
+
+
+def title_key(title: str) -> str:
+    """A listing title reduced to lowercase words, for comparing titles."""
+    return ' '.join(WORD_PATTERN.findall(title.lower()))
+
+
+def similarity(a: Signature, b: Signature) -> float:
+    """Estimated Jaccard similarity of the texts behind two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+@dataclass
+class Match:
+    url: str
+    similarity: float
+    job_info: Optional[dict]
+
+
+class NearDuplicateIndex:
+    """Finds listings whose text is nearly the same as one already seen.
+
+    Signatures are split into ``bands`` of ``NUM_PERM // bands`` values, and
+    listings sharing any band are candidates. Candidates are confirmed by
+    estimated Jaccard similarity against ``threshold``. With 16 bands of 4, a
+    pair at 0.8 similarity becomes a candidate over 99.9% of the time.
+    Different postings from one company can share most of their text
+    (about us, benefits, equal opportunity), so a match must also have the
+    same title; listings without a title never match.
+
+    The index is kept in SQLite so batch workers and later runs share it. Each
+    entry stores the job info extracted for it, so duplicates can reuse it
+    instead of asking the LLM again. Entries are added before extraction with
+    no job info, and ``set_job_info`` fills it in once extraction succeeds.
+    """
+
+    def __init__(self, db_path: str = ":memory:", bands: int = 16, threshold: float = 0.8):
+        if NUM_PERM % bands:
+            raise ValueError(f"bands must divide the signature length ({NUM_PERM})")
+        self.bands = bands
+        self.rows = NUM_PERM // bands
+        self.threshold = threshold
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        # Used from the fetch loop's thread
+        self._db = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints ("
+            "url TEXT PRIMARY KEY, company TEXT, signature TEXT, job_info TEXT, added_at REAL, title TEXT)"
+        )
+        if 'title' not in {row[1] for row in self._db.execute("PRAGMA table_info(fingerprints)")}:
+            # Entries from before titles were stored have none, so they never match
+            self._db.execute("ALTER TABLE fingerprints ADD COLUMN title TEXT")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprint_bands (band TEXT, url TEXT, PRIMARY KEY (band, url))"
+        )
+        self._db.commit()
+
+    def band_keys(self, signature: Signature) -> List[str]:
+        return [
+            f"{band}:" + hashlib.blake2b(repr(signature[band * self.rows:(band + 1) * self.rows]).encode(),
+                                         digest_size=8).hexdigest()
+            for band in range(self.bands)
+        ]
+
+    def find(self, signature: Signature, title: str, exclude: Optional[str] = None) -> Optional[Match]:
+        """Most similar indexed listing with the same title at or above the threshold, other than ``exclude``."""
+        title = title_key(title)
+        if not title:
+            return None
+        keys = self.band_keys(signature)
+        rows = self._db.execute(
+            "SELECT DISTINCT f.url, f.signature, f.job_info FROM fingerprint_bands b "
+            f"JOIN fingerprints f ON f.url = b.url WHERE b.band IN ({', '.join('?' * len(keys))}) AND f.title = ?",
+            keys + [title],
+        ).fetchall()
+        best = None
+        for url, stored, job_info in rows:
+            if url == exclude:
+                continue
+            score = similarity(signature, tuple(json.loads(stored)))
+            if score >= self.threshold and (best is None or score > best.similarity):
+                best = Match(url, score, json.loads(job_info) if job_info else None)
+        return best
+
+    def add(self, url: str, company: str, signature: Signature, title: str, job_info: Optional[dict] = None):
+        self._db.execute(
+            "INSERT OR REPLACE INTO fingerprints (url, company, signature, job_info, added_at, title) VALUES (?, ?, ?, ?, ?, ?)",
+            (url, company, json.dumps(signature), json.dumps(job_info) if job_info else None, time.time(),
+             title_key(title)),
+        )
+        self._db.execute("DELETE FROM fingerprint_bands WHERE url = ?", (url,))
+        self._db.executemany("INSERT OR IGNORE INTO fingerprint_bands VALUES (?, ?)",
+                             [(key, url) for key in self.band_keys(signature)])
+        self._db.commit()
+
+    def set_job_info(self, url: str, job_info: dict):
+        """Store the job info extracted for an indexed listing."""
+        self._db.execute("UPDATE fingerprints SET job_info = ? WHERE url = ?", (json.dumps(job_info), url))
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,117 @@
+""" Parse-once page model, built off the event loop in a process pool """
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from crawlstate import content_hash
+from htmlreducer import HTMLReducer, estimate_tokens, page_title, strip_noise
+from metrics import metrics
+from neardup import Signature, minhash
+from structureddata import find_job_postings_in, job_info_from_posting
+
+
+@dataclass
+class PageDocument:
+    """Everything the crawler reads from a page, from a single parse.
+
+    ``job_info`` is the first schema.org JobPosting mapped to JobAd fields
+    (empty if there is none) and ``text`` is the page reduced to the token
+    budget. ``signature`` is the MinHash of that text, when the parser was
+    asked for signatures. Links are left out, as listing pages don't need
+    them; careers pages are read for links by URLExtractor. Documents only
+    hold plain values, so they can be returned from worker processes.
+    """
+    url: str
+    title: str
+    headings: List[str] = field(default_factory=list)
+    paragraphs: List[str] = field(default_factory=list)
+    text: str = ""
+    job_info: Dict[str, Optional[str]] = field(default_factory=dict)
+    tokens_before: int = 0
+    tokens_after: int = 0
+    signature: Optional[Signature] = None
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+def build_page_document(html_content: str, url: str, max_tokens: int = 3000, signature: bool = False) -> PageDocument:
+    """Parse the HTML once and read the title, headings, text and structured data from it.
+
+    With ``signature``, the reduced text's MinHash signature is computed here
+    too, so near-duplicate checks don't hash on the caller's event loop.
+    """
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html_content, 'html.parser')
+    # JSON-LD lives in script tags, so read it before the noise is stripped
+    postings = find_job_postings_in(soup)
+    strip_noise(soup)
+    title = page_title(soup)
+    headings = [h.get_text(' ', strip=True) for h in soup.find_all(['h1', 'h2', 'h3'])]
+    paragraphs = [p.get_text(' ', strip=True) for p in soup.find_all('p')]
+    # Reduction rewrites the tree, so it goes last
+    page = HTMLReducer(max_tokens=max_tokens).reduce_soup(soup, estimate_tokens(html_content))
+    return PageDocument(
+        url=url,
+        title=title,
+        headings=[heading for heading in headings if heading],
+        paragraphs=[paragraph for paragraph in paragraphs if paragraph],
+        text=page.text,
+        job_info=job_info_from_posting(postings[0]) if postings else {},
+        tokens_before=page.tokens_before,
+        tokens_after=page.tokens_after,
+        signature=minhash(page.text) if signature else None,
+    )
+
+
+def build_listing_document(html_content: str, url: str, max_tokens: int = 3000, signature: bool = False,
+                           known_hash: Optional[str] = None) -> Tuple[str, Optional[PageDocument]]:
+    """Hash a listing page's content, then build its document unless the hash is ``known_hash``."""
+    listing_hash = content_hash(html_content)
+    if listing_hash == known_hash:
+        return listing_hash, None
+    return listing_hash, build_page_document(html_content, url, max_tokens, signature)
+
+
+class PageParser:
+    """Builds PageDocuments without blocking the event loop.
+
+    With ``workers`` > 0, parsing runs in a process pool of that size, so it
+    spreads across cores instead of contending for the GIL. With 0 it runs
+    in the loop's default thread pool, which keeps the loop responsive but
+    stays on one core; use that where processes are already one per core,
+    as in batch mode. With ``signatures``, documents carry a MinHash
+    signature for near-duplicate detection. The pool starts on first use;
+    call close() to stop it.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_tokens: int = 3000, signatures: bool = False):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_tokens = max_tokens
+        self.signatures = signatures
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    async def aparse_listing(self, html_content: str, url: str,
+                             known_hash: Optional[str] = None) -> Tuple[str, Optional[PageDocument]]:
+        """Hash and build a listing's document in the pool; the document is None if the hash is ``known_hash``."""
+        loop = asyncio.get_running_loop()
+        with metrics.timer('parse_seconds', kind='document'):
+            return await loop.run_in_executor(self._executor(), build_listing_document, html_content, url,
+                                              self.max_tokens, self.signatures, known_hash)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def _executor(self) -> Optional[Executor]:
+        if self.workers <= 0:
+            return None
+        if self._pool is None:
+            # Spawned rather than forked: the parent runs fetch and LLM loops on other threads
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
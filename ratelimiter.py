@@ -0,0 +1,104 @@
+""" Token-bucket scheduling for LLM requests with adaptive back-off on 429s """
+import asyncio
+import logging
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Holds up to ``capacity`` units, refilled continuously at ``rate`` units per second."""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, amount: float) -> float:
+        """Take ``amount`` if available and return 0, otherwise return seconds to wait."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Schedules requests within requests-per-minute and tokens-per-minute limits.
+
+    Callers ``await acquire(tokens)`` before each request and report the outcome
+    with ``on_success`` or ``on_rate_limited``. A 429 pauses every caller and
+    halves the effective rate; successes slowly restore it.
+    """
+
+    def __init__(self, rpm: int = 500, tpm: int = 200_000, max_concurrency: int = 16,
+                 min_backoff: float = 1.0, max_backoff: float = 60.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = TokenBucket(capacity=rpm, rate=rpm / 60)
+        self.tokens = TokenBucket(capacity=tpm, rate=tpm / 60)
+        self.max_concurrency = max_concurrency
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.scale = 1.0
+        self.backoff = min_backoff
+        self.paused_until = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def acquire(self, tokens: int):
+        """Wait until a request of ``tokens`` estimated tokens may be sent."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # asyncio primitives belong to one loop; the buckets carry over between loops
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        await self._slots.acquire()
+        try:
+            # Callers queue on the lock so the buckets are drained in arrival order
+            async with self._lock:
+                while True:
+                    wait = self.paused_until - time.monotonic()
+                    if wait <= 0:
+                        wait = self.requests.try_take(1)
+                    if wait <= 0:
+                        wait = self.tokens.try_take(tokens)
+                        if wait > 0:
+                            self.requests.tokens += 1  # Give back the request slot while waiting
+                    if wait <= 0:
+                        return
+                    await asyncio.sleep(wait)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self):
+        """Free the concurrency slot taken by ``acquire``."""
+        self._slots.release()
+
+    def on_success(self):
+        self.backoff = self.min_backoff
+        if self.scale < 1.0:
+            self._set_scale(min(1.0, self.scale + 0.05))
+
+    def on_rate_limited(self, retry_after: Optional[float] = None):
+        delay = retry_after if retry_after is not None else self.backoff
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        self.backoff = min(self.max_backoff, self.backoff * 2)
+        self._set_scale(max(0.1, self.scale / 2))
+        logger.warning(f"🐢 Rate limited, pausing LLM requests for {delay:.1f}s (rate scaled to {self.scale:.0%})")
+
+    def _set_scale(self, scale: float):
+        self.scale = scale
+        self.requests.rate = self.rpm * scale / 60
+        self.tokens.rate = self.tpm * scale / 60
@@ -0,0 +1,428 @@
+""" Append-only, compressed segment files for the HTML cache, indexed by URL hash """
+import argparse
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, so one crawling process per cache
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+RECORD_MAGIC = b'SCR1'
+# magic, codec, key, meta length, data length; followed by the meta JSON and the compressed page
+RECORD_HEADER = struct.Struct('<4sB20sII')
+# key, segment number, record offset, record length, written at, deleted
+INDEX_ENTRY = struct.Struct('<20sIQId?')
+CODEC_NONE, CODEC_ZLIB, CODEC_ZSTD = 0, 1, 2
+SEGMENT_NAME = re.compile(r'seg-(\d{6})\.dat$')
+# Eviction goes this far below max_bytes, so compaction isn't needed again straight away
+EVICT_TO = 0.75
+# Segments are compacted once this share of them is overwritten or deleted pages
+MAX_DEAD_SHARE = 0.5
+
+
+@dataclass
+class Location:
+    segment: int
+    offset: int
+    length: int
+    written_at: float
+
+
+def _zstd():
+    """The zstandard module if installed; it is optional and zlib is used without it."""
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+class SegmentStore:
+    """Pages stored as compressed records appended to large segment files.
+
+    Each record holds the page's metadata and compressed body. ``index.dat``
+    is an append-only log of fixed-size entries mapping a URL hash to the
+    segment, offset and length of its latest record; it is read through
+    mmap on start-up and tailed for entries written by other processes.
+    Overwritten and deleted records stay on disk as dead space until
+    ``compact`` copies the live records into fresh segments, which happens
+    by itself once more than half the segments are dead. When ``max_bytes``
+    is set, every write checks the segments' size, dead space included,
+    against it; the oldest pages are evicted and the rest compacted once
+    they outgrow it. Writers take an exclusive file lock, so batch workers can
+    share one cache, and the whole folder can be copied to another machine
+    as is; the index is rebuilt from the segments if it is missing.
+    """
+
+    def __init__(self, folder: str, segment_bytes: int = 64 << 20, max_bytes: Optional[int] = None,
+                 compression: str = 'zlib'):
+        self.folder = folder
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        os.makedirs(folder, exist_ok=True)
+        self.index_path = os.path.join(folder, 'index.dat')
+        self.lock_path = os.path.join(folder, '.lock')
+        if compression == 'zstd' and _zstd() is None:
+            logger.warning("zstandard is not installed, compressing the HTML cache with zlib")
+            compression = 'zlib'
+        self.codec = {'none': CODEC_NONE, 'zlib': CODEC_ZLIB, 'zstd': CODEC_ZSTD}[compression]
+        self.live_bytes = 0
+        # Size of every record the index has pointed at, i.e. the segments' size, live and dead
+        self.written_bytes = 0
+        self._entries: Dict[bytes, Location] = {}
+        self._index_pos = 0
+        self._index_id = None
+        self._lock = threading.Lock()
+        with self._lock, self._locked():
+            if not os.path.exists(self.index_path) and self._segment_numbers():
+                self._rebuild_index()
+            self._load_index()
+
+    def __contains__(self, key: str) -> bool:
+        return self._location(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def keys(self) -> List[str]:
+        """URL hashes of the stored pages, in disk order."""
+        with self._lock:
+            self._load_index()
+            entries = sorted(self._entries.items(), key=lambda item: (item[1].segment, item[1].offset))
+        return [key.hex() for key, _ in entries]
+
+    def get(self, key: str) -> Optional[Tuple[dict, str]]:
+        """Return (meta, page text) for a URL hash, or None if it isn't stored."""
+        record = self._read(key)
+        if record is None:
+            return None
+        codec, meta, data = record
+        try:
+            return meta, self._decompress(codec, data).decode('utf-8')
+        except (zlib.error, ValueError) as e:
+            logger.warning(f"⚠️ Corrupt HTML cache record for {key}: {e}")
+            return None
+
+    def get_meta(self, key: str) -> Optional[dict]:
+        """Return a page's metadata without decompressing the page."""
+        record = self._read(key, with_data=False)
+        return record[1] if record is not None else None
+
+    def put(self, key: str, text: str, meta: dict):
+        self._append(key, self.codec, meta, self._compress(text.encode('utf-8')))
+
+    def touch(self, key: str, fetched_at: Optional[float] = None) -> bool:
+        """Mark a page as fetched again, e.g. after a 304, without rewriting it.
+
+        Only an index entry is written; ``get`` and ``get_meta`` report the
+        new time as the page's ``fetched_at``.
+        """
+        raw_key = bytes.fromhex(key)
+        with self._lock, self._locked():
+            self._load_index()
+            location = self._entries.get(raw_key)
+            if location is None:
+                return False
+            touched = Location(location.segment, location.offset, location.length, fetched_at or time.time())
+            self._write_index_entries([(raw_key, touched, False)])
+        return True
+
+    def delete(self, key: str):
+        with self._lock, self._locked():
+            self._load_index()
+            self._write_index_entries([(bytes.fromhex(key), Location(0, 0, 0, time.time()), True)])
+
+    def disk_bytes(self) -> int:
+        return sum(os.path.getsize(self._segment_path(number)) for number in self._segment_numbers())
+
+    def stats(self) -> dict:
+        disk = self.disk_bytes()
+        return {'pages': len(self._entries), 'live_bytes': self.live_bytes, 'disk_bytes': disk,
+                'dead_bytes': max(0, disk - self.live_bytes), 'segments': len(self._segment_numbers())}
+
+    def evict(self, max_bytes: int) -> int:
+        """If the segments are over ``max_bytes``, delete the least recently fetched pages and compact."""
+        with self._lock, self._locked():
+            self._load_index()
+            return self._evict(max_bytes)
+
+    def compact(self) -> int:
+        """Copy live records into fresh segments and drop the old ones, returning the bytes reclaimed."""
+        with self._lock, self._locked():
+            self._load_index()
+            return self._compact()
+
+    def close(self):
+        pass
+
+    # Reading
+
+    def _location(self, key: str) -> Optional[Location]:
+        raw_key = bytes.fromhex(key)
+        location = self._entries.get(raw_key)
+        if location is None:
+            with self._lock:
+                self._load_index()
+            location = self._entries.get(raw_key)
+        return location
+
+    def _read(self, key: str, with_data: bool = True) -> Optional[Tuple[int, dict, bytes]]:
+        for attempt in range(2):
+            location = self._location(key)
+            if location is None:
+                return None
+            try:
+                codec, meta, data = self._read_record(location, with_data)
+            except FileNotFoundError:
+                # Another process compacted the segments away; reload its new index and retry
+                with self._lock:
+                    self._index_id = None
+                    self._load_index()
+                continue
+            # The index has the latest fetch time, which a touch doesn't write into the record
+            meta['fetched_at'] = location.written_at
+            return codec, meta, data
+        return None
+
+    def _read_record(self, location: Location, with_data: bool) -> Tuple[int, dict, bytes]:
+        with open(self._segment_path(location.segment), 'rb') as f:
+            f.seek(location.offset)
+            magic, codec, _, meta_length, data_length = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+            if magic != RECORD_MAGIC:
+                raise FileNotFoundError(f"No record at {location}")
+            meta = json.loads(f.read(meta_length))
+            data = f.read(data_length) if with_data else b''
+        return codec, meta, data
+
+    # Writing
+
+    def _append(self, key: str, codec: int, meta: dict, data: bytes):
+        raw_key = bytes.fromhex(key)
+        meta_bytes = json.dumps(meta).encode('utf-8')
+        record = RECORD_HEADER.pack(RECORD_MAGIC, codec, raw_key, len(meta_bytes), len(data)) + meta_bytes + data
+        with self._lock, self._locked():
+            self._load_index()
+            segment = self._active_segment()
+            with open(self._segment_path(segment), 'ab') as f:
+                offset = f.tell()
+                f.write(record)
+            location = Location(segment, offset, len(record), meta.get('fetched_at') or time.time())
+            self._write_index_entries([(raw_key, location, False)])
+            if self.max_bytes and self.written_bytes > self.max_bytes:
+                self._evict(self.max_bytes)
+            elif self.written_bytes > self.segment_bytes and self._dead_bytes() > self.written_bytes * MAX_DEAD_SHARE:
+                self._compact()
+
+    def _active_segment(self) -> int:
+        numbers = self._segment_numbers()
+        if numbers and os.path.getsize(self._segment_path(numbers[-1])) < self.segment_bytes:
+            return numbers[-1]
+        return numbers[-1] + 1 if numbers else 1
+
+    def _write_index_entries(self, entries):
+        with open(self.index_path, 'ab') as f:
+            f.write(b''.join(INDEX_ENTRY.pack(key, location.segment, location.offset, location.length,
+                                              location.written_at, deleted) for key, location, deleted in entries))
+        for key, location, deleted in entries:
+            self._apply(key, location, deleted)
+        self._index_pos += INDEX_ENTRY.size * len(entries)
+
+    def _evict(self, max_bytes: int) -> int:
+        if self.written_bytes <= max_bytes:
+            return 0
+        target = max_bytes * EVICT_TO
+        evicted, live = [], self.live_bytes
+        for key, location in sorted(self._entries.items(), key=lambda item: item[1].written_at):
+            if live <= target:
+                break
+            evicted.append((key, Location(0, 0, 0, time.time()), True))
+            live -= location.length
+        if evicted:
+            self._write_index_entries(evicted)
+            logger.info(f"🧹 Evicted {len(evicted)} pages from the HTML cache")
+        self._compact()
+        return len(evicted)
+
+    def _dead_bytes(self) -> int:
+        return self.written_bytes - self.live_bytes
+
+    def _compact(self) -> int:
+        before = self.disk_bytes()
+        old_segments = self._segment_numbers()
+        segment = (old_segments[-1] if old_segments else 0) + 1
+        new_entries, out, written = [], None, 0
+        try:
+            # Copy in disk order so the old segments are read sequentially
+            for key, location in sorted(self._entries.items(), key=lambda item: (item[1].segment, item[1].offset)):
+                try:
+                    with open(self._segment_path(location.segment), 'rb') as f:
+                        f.seek(location.offset)
+                        record = f.read(location.length)
+                except FileNotFoundError:
+                    continue
+                if out is None or written >= self.segment_bytes:
+                    if out is not None:
+                        out.close()
+                        segment += 1
+                    out, written = open(self._segment_path(segment), 'wb'), 0
+                new_entries.append((key, Location(segment, written, len(record), location.written_at)))
+                out.write(record)
+                written += len(record)
+        finally:
+            if out is not None:
+                out.close()
+
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(b''.join(INDEX_ENTRY.pack(key, loc.segment, loc.offset, loc.length, loc.written_at, False)
+                             for key, loc in new_entries))
+        os.replace(tmp_path, self.index_path)
+        for number in old_segments:
+            os.remove(self._segment_path(number))
+        self._index_id = None
+        self._load_index()
+        reclaimed = before - self.disk_bytes()
+        logger.info(f"🗜️ Compacted the HTML cache: {len(new_entries)} pages kept, {reclaimed} bytes reclaimed")
+        return reclaimed
+
+    # Index
+
+    def _apply(self, key: bytes, location: Location, deleted: bool):
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.live_bytes -= previous.length
+        if not deleted and (previous is None or (previous.segment, previous.offset) != (location.segment, location.offset)):
+            # A new record rather than a touch of the same one
+            self.written_bytes += location.length
+        if not deleted:
+            self._entries[key] = location
+            self.live_bytes += location.length
+
+    def _load_index(self):
+        """Read index entries written since the last call, or the whole index if it was replaced."""
+        try:
+            stat = os.stat(self.index_path)
+        except FileNotFoundError:
+            return
+        index_id = (stat.st_dev, stat.st_ino)
+        if index_id != self._index_id or stat.st_size < self._index_pos:
+            self._entries, self.live_bytes, self.written_bytes = {}, 0, 0
+            self._index_pos, self._index_id = 0, index_id
+        # A partly written trailing entry is picked up once its writer finishes it
+        usable = (stat.st_size - self._index_pos) // INDEX_ENTRY.size * INDEX_ENTRY.size
+        if usable <= 0:
+            return
+        with open(self.index_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            entries = view[self._index_pos:self._index_pos + usable]
+        for key, segment, offset, length, written_at, deleted in INDEX_ENTRY.iter_unpack(entries):
+            self._apply(key, Location(segment, offset, length, written_at), deleted)
+        self._index_pos += usable
+
+    def _rebuild_index(self):
+        """Recreate the index by scanning the segments, e.g. after copying them without it."""
+        entries = {}
+        for number in self._segment_numbers():
+            for key, location in self._scan_segment(number):
+                entries[key] = location
+        with open(self.index_path, 'wb') as f:
+            f.write(b''.join(INDEX_ENTRY.pack(key, loc.segment, loc.offset, loc.length, loc.written_at, False)
+                             for key, loc in entries.items()))
+        logger.info(f"📇 Rebuilt the HTML cache index from segments: {len(entries)} pages")
+
+    def _scan_segment(self, number: int) -> Iterator[Tuple[bytes, Location]]:
+        with open(self._segment_path(number), 'rb') as f:
+            offset = 0
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    return
+                magic, _, key, meta_length, data_length = RECORD_HEADER.unpack(header)
+                body = f.read(meta_length + data_length)
+                if magic != RECORD_MAGIC or len(body) < meta_length + data_length:
+                    logger.warning(f"⚠️ Stopped scanning segment {number} at a damaged record (offset {offset})")
+                    return
+                try:
+                    written_at = float(json.loads(body[:meta_length]).get('fetched_at') or 0)
+                except ValueError:
+                    written_at = 0.0
+                length = RECORD_HEADER.size + meta_length + data_length
+                yield key, Location(number, offset, length, written_at)
+                offset += length
+
+    # Files
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.folder, f"seg-{number:06d}.dat")
+
+    def _segment_numbers(self):
+        return sorted(int(match.group(1)) for match in map(SEGMENT_NAME.match, os.listdir(self.folder)) if match)
+
+    @contextmanager
+    def _locked(self):
+        """Hold the cross-process writer lock."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # Compression
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == CODEC_ZSTD:
+            return _zstd().ZstdCompressor(level=6).compress(data)
+        if self.codec == CODEC_ZLIB:
+            return zlib.compress(data, 6)
+        return data
+
+    @staticmethod
+    def _decompress(codec: int, data: bytes) -> bytes:
+        if codec == CODEC_ZSTD:
+            zstandard = _zstd()
+            if zstandard is None:
+                raise ValueError("page was compressed with zstd, which is not installed")
+            return zstandard.ZstdDecompressor().decompress(data)
+        if codec == CODEC_ZLIB:
+            return zlib.decompress(data)
+        return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and maintain an HTML cache segment store")
+    parser.add_argument("folder", nargs="?", default=os.path.join("HTML_Cache", "segments"), help="Segment store folder")
+    parser.add_argument("command", choices=['stats', 'compact', 'evict', 'rebuild'], help="What to do")
+    parser.add_argument("--max-mb", type=float, help="Size to evict down to, for 'evict'")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == 'rebuild' and os.path.exists(os.path.join(args.folder, 'index.dat')):
+        os.replace(os.path.join(args.folder, 'index.dat'), os.path.join(args.folder, 'index.dat.bak'))
+    store = SegmentStore(args.folder)
+    if args.command == 'compact':
+        store.compact()
+    elif args.command == 'evict':
+        if args.max_mb is None:
+            parser.error("evict needs --max-mb")
+        store.evict(int(args.max_mb * (1 << 20)))
+    print(json.dumps(store.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
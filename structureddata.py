@@ -0,0 +1,134 @@
+""" Extracts schema.org JobPosting data from JSON-LD and microdata """
+import html
+import json
+import logging
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from htmlreducer import html_to_text
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ('title', 'description')
+
+
+def find_job_postings(html_content: str) -> List[dict]:
+    """Return every JobPosting object found in the page's JSON-LD or microdata."""
+    from bs4 import BeautifulSoup
+    return find_job_postings_in(BeautifulSoup(html_content, 'html.parser'))
+
+
+def find_job_postings_in(soup: 'BeautifulSoup') -> List[dict]:
+    """Like find_job_postings, for a page that is already parsed. Scripts must not have been stripped."""
+    postings = []
+    for script in soup.find_all('script', type='application/ld+json'):
+        try:
+            data = json.loads(script.string or '')
+        except ValueError:
+            continue
+        postings.extend(_json_ld_postings(data))
+    for element in soup.find_all(itemtype=lambda value: value and 'schema.org/JobPosting' in value):
+        postings.append(_microdata_item(element))
+    return postings
+
+
+def extract_job_info(html_content: str) -> Dict[str, Optional[str]]:
+    """Map the first JobPosting on the page to JobAd fields; empty if there is none."""
+    postings = find_job_postings(html_content)
+    return job_info_from_posting(postings[0]) if postings else {}
+
+
+def is_complete(job_info: Dict[str, Optional[str]]) -> bool:
+    return all(job_info.get(field) for field in REQUIRED_FIELDS)
+
+
+def job_info_from_posting(posting: dict) -> Dict[str, Optional[str]]:
+    return {
+        'title': _text(posting.get('title') or posting.get('name')),
+        # Descriptions are often entity-escaped HTML
+        'description': html_to_text(html.unescape(_text(posting.get('description')) or '')),
+        'location': _location(posting),
+        'salary': _salary(posting.get('baseSalary') or posting.get('estimatedSalary')),
+    }
+
+
+def _json_ld_postings(data: Any) -> List[dict]:
+    if isinstance(data, list):
+        return [posting for item in data for posting in _json_ld_postings(item)]
+    if not isinstance(data, dict):
+        return []
+    if '@graph' in data:
+        return _json_ld_postings(data['@graph'])
+    types = data.get('@type')
+    types = types if isinstance(types, list) else [types]
+    return [data] if 'JobPosting' in types else []
+
+
+def _microdata_item(element) -> dict:
+    """Collect an itemscope's properties, recursing into nested items."""
+    item = {}
+    for prop in element.find_all(itemprop=True):
+        # Only direct properties; nested itemscopes are collected by their own call
+        owner = prop.find_parent(itemscope=True)
+        if owner is not element:
+            continue
+        if prop.has_attr('itemscope'):
+            value = _microdata_item(prop)
+        elif prop.has_attr('content'):
+            value = prop['content']
+        elif prop.name in ('a', 'link'):
+            value = prop.get('href')
+        elif prop.name == 'meta':
+            value = prop.get('content')
+        else:
+            value = prop.decode_contents() if prop['itemprop'] == 'description' else prop.get_text(' ', strip=True)
+        item.setdefault(prop['itemprop'], value)
+    return item
+
+
+def _text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        return _text(value.get('name') or value.get('value'))
+    if isinstance(value, list):
+        return _text(value[0]) if value else None
+    return str(value).strip() or None
+
+
+def _location(posting: dict) -> Optional[str]:
+    places = posting.get('jobLocation') or []
+    places = places if isinstance(places, list) else [places]
+    locations = []
+    for place in places:
+        address = place.get('address', place) if isinstance(place, dict) else place
+        if isinstance(address, dict):
+            parts = [_text(address.get(key)) for key in ('addressLocality', 'addressRegion', 'addressCountry')]
+            location = ', '.join(part for part in parts if part)
+        else:
+            location = _text(address)
+        if location and location not in locations:
+            locations.append(location)
+    if str(posting.get('jobLocationType', '')).upper() == 'TELECOMMUTE':
+        locations.append('Remote')
+    return '; '.join(locations) or None
+
+
+def _salary(salary: Any) -> Optional[str]:
+    if salary is None:
+        return None
+    if not isinstance(salary, dict):
+        return _text(salary)
+    currency = _text(salary.get('currency'))
+    value = salary.get('value', salary)
+    if isinstance(value, dict):
+        low, high = value.get('minValue'), value.get('maxValue')
+        amount = '-'.join(str(v) for v in (low, high) if v is not None) or _text(value.get('value'))
+        unit = _text(value.get('unitText'))
+    else:
+        amount, unit = _text(value), _text(salary.get('unitText'))
+    if not amount:
+        return None
+    return ' '.join(part for part in (currency, amount, f"per {unit.lower()}" if unit else None) if part)
@@ -1,40 +1,22 @@
 from typing import List
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
 import openai
 import os
 import logging
 from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-# logger = logging.getLogger(__name__)
-
-# Set up your OpenAI API key
-openai.api_key = os.environ.get("OPENAI_API_KEY")
+from linkscorer import JOB_KEYWORDS
+from linkextractor import extract_links
+from asyncfetcher import AsyncFetcher
+from frontier import CrawlFrontier, RobotsCache
 
 def extract_urls_from_html(html_content: str, base_url: str) -> List[str]:
     """Extract all unique, valid URLs from the HTML content."""
     # logging.info(f"🔍 Extracting URLs from HTML content (base URL: {base_url})")
     
-    soup = BeautifulSoup(html_content, 'html.parser')
-    urls = set()
-    
-    for tag in soup.find_all('a', href=True):
-        href = tag.get('href')
-        if href:
-            full_url = urljoin(base_url, href)
-            parsed = urlparse(full_url)
-            if parsed.scheme in ('http', 'https') and parsed.netloc:
-                urls.add(full_url)
+    urls = [link.url for link in extract_links(html_content, base_url, same_site=False)]
     
     # Filter URLs to only include those likely to be job-related
-    job_keywords = ['job', 'career', 'employment', 'vacancy', 'position', 'opportunity', 'hiring']
-    filtered_urls = [url for url in urls if any(keyword in url.lower() for keyword in job_keywords)]
+    filtered_urls = [url for url in urls if any(keyword in url.lower() for keyword in JOB_KEYWORDS)]
     
     logging.info(f"📋 Extracted {len(filtered_urls)} URLs")
     return filtered_urls
@@ -42,9 +24,7 @@ def extract_urls_from_html(html_content: str, base_url: str) -> List[str]:
 def get_urls_from_page(url):
     try:
         response = requests.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        links = soup.find_all('a', href=True)
-        return [urljoin(url, link['href']) for link in links]
+        return [link.url for link in extract_links(response.text, url, same_site=False)]
     except requests.RequestException:
         return []
 
@@ -115,49 +95,57 @@ def verify_job_listings_page(url):
     except requests.RequestException:
         return False
     
+def fetch_text(url):
+    try:
+        response = requests.get(url, timeout=30)
+        return response.text if response.ok else ""
+    except requests.RequestException:
+        return ""
+
 def find_job_listings(start_url, max_attempts=10):
-    visited_urls = set()
-    urls_to_check = [start_url]
+    frontier = CrawlFrontier(max_pages=max_attempts, robots=RobotsCache(AsyncFetcher()))
+    frontier.add(start_url, score=1.0)
     
     for _ in range(max_attempts):
-        if not urls_to_check:
+        entry = frontier.pop()
+        if entry is None:
             break
         
-        current_url = urls_to_check.pop(0)
-        
-        if current_url in visited_urls:
+        page_content = fetch_text(entry.url)
+        if not page_content:
             continue
+        potential_urls = extract_urls_from_html(page_content, start_url)
         
-        visited_urls.add(current_url)
+        most_likely_url = find_most_likely_job_page(potential_urls, frontier.visited)
         
-        try:
-            response = requests.get(current_url)
-            page_content = response.text
-            potential_urls = extract_urls_from_html(page_content, start_url)
-            
-            most_likely_url = find_most_likely_job_page(potential_urls, visited_urls)
-            
-            if most_likely_url and verify_job_listings_page(most_likely_url):
-                return most_likely_url
-            
-            urls_to_check.extend([url for url in potential_urls if url not in visited_urls])
+        if most_likely_url and verify_job_listings_page(most_likely_url):
+            return most_likely_url
         
-        except requests.RequestException:
-            continue
+        frontier.add_links(((url, "") for url in potential_urls), entry.depth + 1)
     
     return None
 
-# Usage
-start_url = "https://www.marksandspencer.com/"  # Replace with the website you want to crawl
-job_listings_url = find_job_listings(start_url)
+if __name__ == "__main__":
+    # Load environment variables
+    load_dotenv()
 
-if job_listings_url:
-    print(f"Job listings found at: {job_listings_url}")
-    file_name = job_listings_url.split(".")[1]
-    print(f"saving as {file_name}.txt")
-    with open(f"{file_name}.txt", "w", encoding="utf-8") as f:
-        f.writelines(job_listings_url)
-        f.close()
-    
-else:
-    print("No job listings page found within the maximum attempts.")
\ No newline at end of file
+    # Set up logging
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    # Set up your OpenAI API key
+    openai.api_key = os.environ.get("OPENAI_API_KEY")
+
+    # Usage
+    start_url = "https://www.marksandspencer.com/"  # Replace with the website you want to crawl
+    job_listings_url = find_job_listings(start_url)
+
+    if job_listings_url:
+        print(f"Job listings found at: {job_listings_url}")
+        file_name = job_listings_url.split(".")[1]
+        print(f"saving as {file_name}.txt")
+        with open(f"{file_name}.txt", "w", encoding="utf-8") as f:
+            f.writelines(job_listings_url)
+            f.close()
+
+    else:
+        print("No job listings page found within the maximum attempts.")
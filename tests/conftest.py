@@ -0,0 +1,63 @@
+""" Shared pytest fixtures: the repository root on sys.path and a local stand-in for the ATS feed APIs """
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from asyncfetcher import AsyncFetcher  # noqa: E402
+from atsdetector import DEFAULT_FEED_BASES, FEED_PATHS  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+BOARD_TOKEN = 'acme'
+
+
+class ATSFeedHandler(BaseHTTPRequestHandler):
+    """Serves fixtures/ats/<provider>.json at /<provider> plus that provider's feed path for BOARD_TOKEN.
+
+    The 'broken' board answers with invalid JSON and any other board with a 404.
+    """
+
+    def do_GET(self):
+        provider, _, feed_path = self.path.lstrip('/').partition('/')
+        if provider not in FEED_PATHS:
+            return self._send(404, b'')
+        if '/' + feed_path == FEED_PATHS[provider].format(token=BOARD_TOKEN):
+            with open(os.path.join(FIXTURES, 'ats', f"{provider}.json"), 'rb') as f:
+                return self._send(200, f.read())
+        if '/' + feed_path == FEED_PATHS[provider].format(token='broken'):
+            return self._send(200, b'{"jobs": [')
+        self._send(404, b'{"error": "board not found"}')
+
+    def _send(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope='session')
+def ats_feed_bases():
+    """Feed origins for every provider, pointing at a local server."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ATSFeedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    origin = f"http://127.0.0.1:{server.server_address[1]}"
+    yield {provider: f"{origin}/{provider}" for provider in DEFAULT_FEED_BASES}
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(scope='session')
+def fetcher():
+    fetcher = AsyncFetcher(timeout=10)
+    yield fetcher
+    fetcher.close()
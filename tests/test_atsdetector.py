@@ -0,0 +1,96 @@
+import pytest
+
+from atsdetector import ATSBoard, ATSClient, detect_ats
+from jobad import JobAd
+
+COMPANY = 'acme.com'
+
+
+@pytest.mark.parametrize('html, provider, token', [
+    ('<script src="https://boards.greenhouse.io/embed/job_board/js?for=acme"></script>', 'greenhouse', 'acme'),
+    ('<iframe src="https://boards.greenhouse.io/embed/job_board?for=acme-labs"></iframe>', 'greenhouse', 'acme-labs'),
+    ('fetch("https://boards-api.greenhouse.io/v1/boards/acme/jobs")', 'greenhouse', 'acme'),
+    ('<a href="https://job-boards.eu.greenhouse.io/acme">Jobs</a>', 'greenhouse', 'acme'),
+    ('<a href="https://boards.greenhouse.io/acme/jobs/4012345">Engineer</a>', 'greenhouse', 'acme'),
+    ('fetch("https://api.lever.co/v0/postings/acme.io?mode=json")', 'lever', 'acme.io'),
+    ('<a href="https://jobs.eu.lever.co/acme">Open roles</a>', 'lever', 'acme'),
+    ('<script src="https://apply.workable.com/api/v1/widget/accounts/acme"></script>', 'workable', 'acme'),
+    ('<a href="https://apply.workable.com/acme/">Careers</a>', 'workable', 'acme'),
+    ('<a href="https://acme.workable.com">Careers</a>', 'workable', 'acme'),
+    ('fetch("https://api.ashbyhq.com/posting-api/job-board/acme")', 'ashby', 'acme'),
+    ('<iframe src="https://jobs.ashbyhq.com/acme%20labs"></iframe>', 'ashby', 'acme%20labs'),
+])
+def test_detect_ats(html, provider, token):
+    assert detect_ats(f"<html><body>{html}</body></html>") == ATSBoard(provider, token)
+
+
+@pytest.mark.parametrize('html', [
+    '<a href="/careers">Careers</a>',
+    '<a href="https://apply.workable.com/j/A1B2C3D4E5">Apply</a>',
+    '<a href="https://www.workable.com/">Powered by Workable</a>',
+])
+def test_detect_ats_ignores_pages_without_a_board(html):
+    assert detect_ats(f"<html><body>{html}</body></html>") is None
+
+
+@pytest.fixture
+def client(fetcher, ats_feed_bases):
+    return ATSClient(fetcher, feed_bases=ats_feed_bases)
+
+
+def fetch(client, fetcher, provider, token='acme'):
+    return fetcher.run(client.fetch_job_ads(ATSBoard(provider, token), COMPANY))
+
+
+def test_feed_url_uses_overridden_origin(client, ats_feed_bases):
+    assert client.feed_url(ATSBoard('lever', 'acme')) == ats_feed_bases['lever'] + '/v0/postings/acme?mode=json'
+    assert ATSClient(None).feed_url(ATSBoard('lever', 'acme')) == 'https://api.lever.co/v0/postings/acme?mode=json'
+
+
+def test_map_greenhouse(client, fetcher):
+    assert fetch(client, fetcher, 'greenhouse') == [
+        JobAd(url='https://boards.greenhouse.io/acme/jobs/4012345', title='Senior Backend Engineer',
+              description='Build payment APIs. Python & Go', company=COMPANY, location='London, UK'),
+        JobAd(url='https://boards.greenhouse.io/acme/jobs/4012346', title='Recruiter', description='',
+              company=COMPANY, location=None),
+    ]
+
+
+def test_map_lever(client, fetcher):
+    assert fetch(client, fetcher, 'lever') == [
+        JobAd(url='https://jobs.lever.co/acme/5f8c2a1e-0000-4000-8000-000000000001', title='Data Analyst',
+              description='Turn raw data into decisions. Hybrid, two days a week in the office.', company=COMPANY,
+              location='Manchester', salary='GBP 45000-55000 per-year-salary'),
+        JobAd(url='https://jobs.lever.co/acme/5f8c2a1e-0000-4000-8000-000000000002', title='Support Specialist',
+              description='Help customers succeed.', company=COMPANY, location=None, salary=None),
+    ]
+
+
+def test_map_workable(client, fetcher):
+    assert fetch(client, fetcher, 'workable') == [
+        JobAd(url='https://apply.workable.com/j/A1B2C3D4E5', title='Product Manager',
+              description='Own the roadmap for our mobile app.', company=COMPANY,
+              location='Leeds, England, United Kingdom'),
+        JobAd(url='https://apply.workable.com/j/F6G7H8I9J0', title='Designer', description='Design things.',
+              company=COMPANY, location=None),
+    ]
+
+
+def test_map_ashby_skips_unlisted_jobs(client, fetcher):
+    assert fetch(client, fetcher, 'ashby') == [
+        JobAd(url='https://jobs.ashbyhq.com/acme/0b7e6c52-0000-4000-8000-000000000001', title='DevOps Engineer',
+              description='Keep our platform running.', company=COMPANY, location='Remote',
+              salary='£70K – £85K'),
+        JobAd(url='https://jobs.ashbyhq.com/acme/0b7e6c52-0000-4000-8000-000000000002', title='QA Engineer',
+              description='Test everything.', company=COMPANY, location='Bristol', salary=None),
+    ]
+
+
+@pytest.mark.parametrize('provider', ['greenhouse', 'lever', 'workable', 'ashby'])
+def test_missing_board_returns_no_job_ads(client, fetcher, provider):
+    assert fetch(client, fetcher, provider, token='gone') == []
+
+
+@pytest.mark.parametrize('provider', ['greenhouse', 'lever', 'workable', 'ashby'])
+def test_malformed_feed_returns_no_job_ads(client, fetcher, provider):
+    assert fetch(client, fetcher, provider, token='broken') == []
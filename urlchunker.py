@@ -0,0 +1,44 @@
+""" Token-budgeted chunking of URL lists so each LLM prompt stays small and chunks run in parallel """
+import asyncio
+from typing import Awaitable, Callable, Iterable, List, TypeVar
+
+from htmlreducer import estimate_tokens
+from urlutils import canonicalize_url
+
+T = TypeVar('T')
+
+DEFAULT_CHUNK_TOKENS = 1500
+
+
+def dedupe_urls(urls: Iterable[str]) -> List[str]:
+    """Keep the first of each group of URLs with the same canonical form, in order."""
+    seen, unique = set(), []
+    for url in urls:
+        canonical = canonicalize_url(url)
+        if canonical not in seen:
+            seen.add(canonical)
+            unique.append(url)
+    return unique
+
+
+def chunk_urls(urls: Iterable[str], max_tokens: int = DEFAULT_CHUNK_TOKENS) -> List[List[str]]:
+    """Split deduplicated URLs into chunks of at most ``max_tokens``, one URL per line.
+
+    A single URL over the budget still gets a chunk of its own.
+    """
+    chunks, chunk, chunk_tokens = [], [], 0
+    for url in dedupe_urls(urls):
+        tokens = estimate_tokens(url) + 1
+        if chunk and chunk_tokens + tokens > max_tokens:
+            chunks.append(chunk)
+            chunk, chunk_tokens = [], 0
+        chunk.append(url)
+        chunk_tokens += tokens
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+async def map_chunks(func: Callable[[List[str]], Awaitable[T]], chunks: List[List[str]]) -> List[T]:
+    """Run ``func`` on every chunk concurrently, returning results in chunk order."""
+    return list(await asyncio.gather(*(func(chunk) for chunk in chunks)))
@@ -1,23 +1,28 @@
 """ Given the html of a webpage, this should be able to extract urls and determine whether they're job listings."""
+import asyncio
+import logging
 import re
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
-import openai
-import json
-import re
-import os
-from dotenv import load_dotenv
+from urllib.parse import urlparse
+from llmclient import get_llm_client
+from linkextractor import extract_links
+from metrics import metrics
+from urlchunker import DEFAULT_CHUNK_TOKENS, chunk_urls, dedupe_urls, map_chunks
+from urltemplates import URLTemplates
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
 class URLExtractor:
-    def __init__(self, base_url):
+    def __init__(self, base_url, templates: URLTemplates = None, run=asyncio.run, chunk_tokens=DEFAULT_CHUNK_TOKENS):
         self.base_url = base_url
-        openai.api_key = os.environ.get("OPENAI_API_KEY")
+        # Runs the async LLM calls from sync code; the crawler passes its event loop's runner
+        self.run = run
+        self.chunk_tokens = chunk_tokens
+        # Listing URL patterns learned from the LLM's confirmed answers
+        self.templates = templates or URLTemplates()
 
     def get_urls_from_string(self, text):
         # Updated regular expression pattern to match more complete URLs
-        url_pattern = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+(?:/[^?\s]*)?(?:\?[^\s#]*)?(?:#[^\s]*)?'
+        url_pattern = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+(?::\d+)?(?:/[^?\s]*)?(?:\?[^\s#]*)?(?:#[^\s]*)?'
 
         # Find all matches of the pattern in the text
         urls = re.findall(url_pattern, text)
@@ -26,18 +31,19 @@ class URLExtractor:
 
     def get_urls_from_html_file(self, html_file):
         with open(html_file, 'r', encoding='utf-8') as file:
-            soup = BeautifulSoup(file, 'html.parser')
-
-        urls = []
-        for a in soup.find_all('a', href=True):
-            url = urljoin(self.base_url, a['href'])
-            urls.append(url)
-        urls = set(urls)
-        urls = [url for url in urls if self.base_url in url]
-        return urls
+            return self.get_urls_from_html(file.read())
+
+    def get_urls_from_html(self, html_content):
+        return [url for url, _ in self.get_links_from_html(html_content)]
 
-    def analyse_urls(self, urls):
-        url_list = "\n".join(urls[:20])  # Limit to 20 URLs to avoid token limit
+    def get_links_from_html(self, html_content):
+        """Return unique (url, anchor text) pairs for same-site links in the HTML."""
+        with metrics.timer('parse_seconds', kind='links'):
+            return extract_links(html_content, self.base_url)
+
+    async def aanalyse_urls(self, urls):
+        """Return the URLs the LLM picks out as job listings from one chunk of URLs."""
+        url_list = "\n".join(urls)
         prompt = f"""
         Analyze the following URLs to identify job listings or pages likely to lead to job listings:
 
@@ -62,8 +68,7 @@ class URLExtractor:
         Prioritize job listings over career pages. If job listings are found, do not include career pages.
         """
 
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
+        response = await get_llm_client().achat(
             messages=[
                 {"role": "system", "content": "You are a helpful assistant that analyzes URLs."},
                 {"role": "user", "content": prompt}
@@ -74,14 +79,22 @@ class URLExtractor:
             temperature=0.5,
         )
 
-
-        return response.choices[0].message.content.strip().lower()
-
-    def validate_urls(self, urls):
+        # NOTE: This will dictate whether we have found
+        # 1. A careers page url
+        # 2. A careers page with job listing urls
+        # 3. Nothing useful (meaning we should abandon)
+        analysis = response.strip().lower()
+        if "job_listings" not in analysis:
+            return []
+        return self.get_urls_from_string(analysis)
+
+    async def avalidate_urls(self, urls):
+        """Return the URLs in one chunk of candidates that the LLM confirms are job listings."""
+        url_list = "\n".join(urls)
         prompt = f"""
         Analyze the following URLs to identify job listings:
 
-        {urls}
+        {url_list}
 
         Respond in only one of the following formats according to the condition:
 
@@ -96,8 +109,7 @@ class URLExtractor:
 
         """
 
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
+        response = await get_llm_client().achat(
             messages=[
                 {"role": "system", "content": "You are a helpful assistant that analyzes URLs."},
                 {"role": "user", "content": prompt}
@@ -105,34 +117,53 @@ class URLExtractor:
             max_tokens=200,
             temperature=0.3,
         )
-        resp = response.choices[0].message.content.strip().lower()
-        return resp
+        analysis = response.strip().lower()
+        if "no_results" in analysis:
+            return []
+        return self.get_urls_from_string(analysis)
+
+    def find_job_listing_urls(self, urls):
+        """Return the URLs that are job listings.
+
+        URLs matching a listing template learned for their site are accepted
+        without asking the LLM. The rest go to the LLM, which is asked twice,
+        and the listings it confirms teach new templates.
+        """
+        matched, unmatched = self.templates.classify(urls)
+        metrics.inc('url_classified_total', len(matched), method='template')
+        if matched:
+            logger.info(f"📐 {len(matched)} links match learned listing templates, {len(unmatched)} left for the LLM")
+        confirmed = self.ask_llm_for_job_listing_urls(unmatched) if unmatched else []
+        metrics.inc('url_classified_total', len(unmatched), method='llm')
+        self.templates.learn(confirmed)
+        found = set(matched) | set(confirmed)
+        return [url for url in dict.fromkeys(list(urls) + confirmed) if url in found]
+
+    def ask_llm_for_job_listing_urls(self, urls):
+        """Ask the LLM which of the URLs are job listings, then double-check its answer."""
+        return self.run(self.aask_llm_for_job_listing_urls(urls))
+
+    async def aask_llm_for_job_listing_urls(self, urls):
+        """Map-reduce over token-budgeted chunks: analyse every chunk in parallel, then validate the merged candidates."""
+        chunks = chunk_urls(urls, self.chunk_tokens)
+        if len(chunks) > 1:
+            logger.info(f"🧩 Analysing {len(urls)} URLs in {len(chunks)} chunks")
+        candidates = dedupe_urls(url for found in await map_chunks(self.aanalyse_urls, chunks) for url in found)
+        if not candidates:
+            return []
+        validated = await map_chunks(self.avalidate_urls, chunk_urls(candidates, self.chunk_tokens))
+        # The analysis is lowercased, so map URLs back to their original case
+        originals = {url.lower(): url for url in urls}
+        return dedupe_urls(originals.get(url, url) for found in validated for url in found)
 
     def process_urls(self, html_file):
         urls = self.get_urls_from_html_file(html_file)
+        job_listing_urls = self.find_job_listing_urls(urls)
 
-        # NOTE: This will dictate whether we have found
-        # 1. A careers page url
-        # 2. A careers page with job listing urls
-        # 3. Nothing useful (meaning we should abandon)
-        analysis = self.analyse_urls(urls).lower()
-
-        if "job_listings" in analysis:
-            # Extract urls from analysis string
-            job_listing_urls = self.get_urls_from_string(analysis)
-            # Evaluate URLs using OpenAI to determine if they are job listings
-            analysis = self.validate_urls(job_listing_urls)
-            try:
-                if analysis == "NO_RESULTS":
-                    print("No listings apparently")
-                    exit(0)
-                fin = self.get_urls_from_string(analysis)
-                self.save_urls_to_file(fin)
-
-            except json.JSONDecodeError:
-                return "Error: Unable to parse the response from the AI model."
+        if job_listing_urls:
+            self.save_urls_to_file(job_listing_urls)
         else:
-            return f"No direct job listings found. Analysis: {analysis}"
+            return "No direct job listings found."
 
     def save_urls_to_file(self, urls):
         if not urls:
@@ -158,7 +189,8 @@ class URLExtractor:
 
         print(f"URLs have been saved to {filename}")
 
-# Usage example
-extractor = URLExtractor('https://www.futurlab.co.uk')
-result = extractor.process_urls('HTMLCache/futurlab.html')
-print(result)
+if __name__ == "__main__":
+    # Usage example
+    extractor = URLExtractor('https://www.futurlab.co.uk')
+    result = extractor.process_urls('HTMLCache/futurlab.html')
+    print(result)
@@ -0,0 +1,142 @@
+""" Learns per-site URL templates from confirmed job listings to classify links without the LLM """
+import logging
+import os
+import re
+import sqlite3
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlparse
+
+from urlutils import site_host
+
+logger = logging.getLogger(__name__)
+
+# Generalized segment shapes, checked in order. Each placeholder compiles back to the
+# same pattern it was inferred from, and none matches across '/', '?' or '&'.
+SEGMENT_SHAPES = [
+    ('<num>', r'\d+'),
+    ('<uuid>', r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'),
+    ('<num>-<slug>', r'\d+[-_][^/?&]+'),
+    ('<slug>-<num>', r'[^/?&]+[-_]\d+'),
+    ('<id>', r'[^/?&]*\d[^/?&]*'),
+    ('<slug>', r'[^/?&]+(?:[-_+][^/?&]+){2,}'),
+]
+PLACEHOLDER_PATTERNS = dict(SEGMENT_SHAPES)
+SHAPE_RES = [(placeholder, re.compile(pattern)) for placeholder, pattern in SEGMENT_SHAPES]
+PLACEHOLDER_RE = re.compile('|'.join(re.escape(placeholder) for placeholder in sorted(PLACEHOLDER_PATTERNS, key=len, reverse=True)))
+# A slug alone says little: '/careers/<slug>' would also match '/careers/life-at-acme'
+ID_PLACEHOLDERS = set(PLACEHOLDER_PATTERNS) - {'<slug>'}
+
+
+def generalize(value: str) -> str:
+    """Replace an ID- or slug-like path segment or query value with a placeholder."""
+    for placeholder, shape in SHAPE_RES:
+        if shape.fullmatch(value):
+            return placeholder
+    return value
+
+
+def infer_template(url: str) -> Optional[str]:
+    """Path and query template of a listing URL, e.g. '/careers/jobs/<num>-<slug>'.
+
+    Returns None when the URL has no ID-like part or nothing literal left,
+    since such a template would match one page, or pages that aren't listings.
+    """
+    parsed = urlparse(url.lower())
+    segments = [generalize(segment) for segment in parsed.path.split('/') if segment]
+    query = [f"{key}={generalize(value)}" for key, value in sorted(parse_qsl(parsed.query, keep_blank_values=True))]
+    parts = segments + query
+    if not any(part.split('=')[-1] in ID_PLACEHOLDERS for part in parts):
+        return None
+    if all(PLACEHOLDER_RE.fullmatch(segment) for segment in segments) and not query:
+        return None
+    return '/' + '/'.join(segments) + ('?' + '&'.join(query) if query else '')
+
+
+def template_regex(template: str) -> re.Pattern:
+    """Compile a template into a regex over a URL's lowercased path and query."""
+    pattern, position = '', 0
+    for match in PLACEHOLDER_RE.finditer(template):
+        pattern += re.escape(template[position:match.start()]) + PLACEHOLDER_PATTERNS[match.group()]
+        position = match.end()
+    return re.compile(pattern + re.escape(template[position:]))
+
+
+def path_and_query(url: str) -> str:
+    parsed = urlparse(url.lower())
+    return (parsed.path.rstrip('/') or '/') + (f"?{parsed.query}" if parsed.query else '')
+
+
+class URLTemplates:
+    """Per-site listing URL templates learned from confirmed job URLs.
+
+    Each template counts how many confirmed listings it was inferred from,
+    and only templates with at least ``min_support`` are used, so one odd
+    URL can't teach a pattern. Templates are kept in SQLite so later runs
+    and other batch workers start with them.
+    """
+
+    def __init__(self, db_path: str = ":memory:", min_support: int = 2):
+        self.min_support = min_support
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        # Used from the crawler's thread, the same as CrawlState
+        self._db = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS url_templates ("
+            "site TEXT, template TEXT, support INTEGER, updated_at REAL, PRIMARY KEY (site, template))"
+        )
+        self._db.commit()
+        self._compiled: Dict[str, List[re.Pattern]] = {}
+
+    def templates(self, site: str) -> List[str]:
+        rows = self._db.execute(
+            "SELECT template FROM url_templates WHERE site = ? AND support >= ? ORDER BY support DESC",
+            (site, self.min_support),
+        )
+        # Slug-only templates learned by earlier versions are ignored
+        return [template for (template,) in rows if ID_PLACEHOLDERS & set(PLACEHOLDER_RE.findall(template))]
+
+    def classify(self, urls: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """Split URLs into those matching a learned listing template and the rest."""
+        matched, unmatched = [], []
+        for url in urls:
+            (matched if self.matches(url) else unmatched).append(url)
+        return matched, unmatched
+
+    def matches(self, url: str) -> bool:
+        site = site_host(url)
+        if site not in self._compiled:
+            self._compiled[site] = [template_regex(template) for template in self.templates(site)]
+        target = path_and_query(url)
+        return any(pattern.fullmatch(target) for pattern in self._compiled[site])
+
+    def learn(self, job_urls: Iterable[str]) -> List[str]:
+        """Count the templates of confirmed job URLs, returning any that just became usable."""
+        counts = Counter()
+        for url in set(job_urls):
+            template = infer_template(url)
+            if template is not None:
+                counts[site_host(url), template] += 1
+        if not counts:
+            return []
+        before = {site: set(self.templates(site)) for site, _ in counts}
+        now = time.time()
+        self._db.executemany(
+            "INSERT INTO url_templates VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(site, template) DO UPDATE SET support = support + excluded.support, updated_at = excluded.updated_at",
+            [(site, template, support, now) for (site, template), support in counts.items()],
+        )
+        self._db.commit()
+        learned = []
+        for site in before:
+            self._compiled.pop(site, None)
+            for template in self.templates(site):
+                if template not in before[site]:
+                    logger.info(f"📐 Learned job listing URL template for {site}: {template}")
+                    learned.append(template)
+        return learned
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,48 @@
+""" Helpers for putting URLs into a canonical form """
+import hashlib
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+TRACKING_PARAMS = {'gclid', 'fbclid', 'msclkid', 'mc_cid', 'mc_eid', 'ref', 'source', '_ga', '_gl'}
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalize a URL so trivially different variants compare equal.
+
+    Lowercases the scheme and host, drops default ports, fragments and
+    tracking parameters, sorts the query string and removes trailing slashes.
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or '').lower()
+    if parsed.port and parsed.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parsed.port}"
+
+    path = parsed.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/') or '/'
+
+    query = [
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    ]
+    query.sort()
+
+    return urlunparse((scheme, host, path, '', urlencode(query), ''))
+
+
+def url_hash(url: str) -> str:
+    """Stable hex digest of a URL's canonical form, used for cache keys."""
+    return hashlib.sha1(canonicalize_url(url).encode('utf-8')).hexdigest()
+
+
+def site_host(url: str) -> str:
+    """Host of a URL without a leading 'www.'."""
+    host = (urlparse(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def is_same_site(url: str, base_url: str) -> bool:
+    """True if url is on base_url's host or one of its subdomains (e.g. careers.example.com)."""
+    host, base = site_host(url), site_host(base_url)
+    return bool(host) and (host == base or host.endswith('.' + base))
@@ -1,34 +1,41 @@
+import asyncio
 import re
 import os
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
-import openai
-import requests
-from dotenv import load_dotenv
-
-load_dotenv()
+from llmclient import get_llm_client, load_env
+from pagedocument import PageDocument, build_page_document
+from urlchunker import DEFAULT_CHUNK_TOKENS, chunk_urls, dedupe_urls, map_chunks
 
 class URLValidator:
-    def __init__(self):
+    def __init__(self, chunk_tokens=DEFAULT_CHUNK_TOKENS, scraper=None):
+        self.chunk_tokens = chunk_tokens
+        # Fetches pages passed by URL alone; created on first use if not given
+        self.scraper = scraper
+        load_env()
         self.openai_api_key = os.environ.get("OPENAI_API_KEY")
         if not self.openai_api_key:
             raise ValueError("OpenAI API key not found in environment variables")
-        openai.api_key = self.openai_api_key
-
-    def validate_career_page(self, url, html_content):
-        """Validate if the given URL is indeed a career page by analyzing its HTML content."""
-        # Extract key elements from the HTML
-        soup = BeautifulSoup(html_content, 'html.parser')
-        title = soup.title.string if soup.title else ""
-        headers = [h.text for h in soup.find_all(['h1', 'h2', 'h3'])]
-        paragraphs = [p.text for p in soup.find_all('p')]
-        
+
+    def validate_career_page(self, url, html_content=None, document: PageDocument = None):
+        """Validate if the given URL is indeed a career page by analyzing its HTML content.
+
+        Pass the page's PageDocument instead of its HTML to avoid parsing it again.
+        With neither, only the start of the page is downloaded, since the title,
+        top headings and first paragraphs are all that is read.
+        """
+        if html_content is None and document is None:
+            if self.scraper is None:
+                from webpagescraper import WebPageScraper
+                self.scraper = WebPageScraper()
+            html_content = self.scraper.get_html(url, head_only=True)
+        # Key elements of the page, with navigation and script noise already dropped
+        document = document or build_page_document(html_content, url)
+
         # Prepare the content for analysis
         content_summary = f"""
         URL: {url}
-        Title: {title}
-        Headers: {' | '.join(headers[:5])}  # Limit to first 5 headers
-        Paragraphs: {' '.join(paragraphs[:3])}  # Limit to first 3 paragraphs
+        Title: {document.title}
+        Headers: {' | '.join(document.headings[:5])}  # Limit to first 5 headers
+        Paragraphs: {' '.join(document.paragraphs[:3])}  # Limit to first 3 paragraphs
         """
 
         prompt = f"""
@@ -43,8 +50,7 @@ class URLValidator:
         Explanation: [Your reasoning here]
         """
 
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
+        response = get_llm_client().chat(
             messages=[
                 {"role": "system", "content": "You are a helpful assistant that validates career pages."},
                 {"role": "user", "content": prompt}
@@ -53,15 +59,26 @@ class URLValidator:
             temperature=0.3,
         )
 
-        result = response.choices[0].message['content'].strip()
+        result = response.strip()
         is_valid = result.startswith("VALID_CAREER_PAGE")
         explanation = result.split("Explanation:")[1].strip() if "Explanation:" in result else ""
         
         return is_valid, explanation
 
     def validate_job_listings(self, urls):
-        """Validate if the given URLs are indeed job listings."""
-        url_list = "\n".join(urls[:20])  # Limit to 20 URLs to avoid token limit
+        """Validate if the given URLs are indeed job listings, in parallel token-budgeted chunks."""
+        async def validate_all():
+            try:
+                validated = await map_chunks(self.avalidate_job_listings, chunk_urls(urls, self.chunk_tokens))
+            finally:
+                # The client's connections belong to this short-lived loop
+                await get_llm_client().aclose()
+            return dedupe_urls(url for found in validated for url in found)
+        return asyncio.run(validate_all())
+
+    async def avalidate_job_listings(self, urls):
+        """Validate one chunk of URLs."""
+        url_list = "\n".join(urls)
         prompt = f"""
         Analyze the following URLs to confirm if they are job listings:
 
@@ -77,8 +94,7 @@ class URLValidator:
         NO_VALID_JOB_LISTINGS
         """
 
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
+        response = await get_llm_client().achat(
             messages=[
                 {"role": "system", "content": "You are a helpful assistant that validates job listing URLs."},
                 {"role": "user", "content": prompt}
@@ -87,7 +103,7 @@ class URLValidator:
             temperature=0.3,
         )
 
-        result = response.choices[0].message['content'].strip()
+        result = response.strip()
         if result.startswith("VALID_JOB_LISTINGS"):
             return self.extract_urls_from_text(result)
         return []
@@ -95,5 +111,5 @@ class URLValidator:
     @staticmethod
     def extract_urls_from_text(text):
         """Extract URLs from a given text."""
-        url_pattern = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+(?:/[^?\s]*)?(?:\?[^\s#]*)?(?:#[^\s]*)?'
+        url_pattern = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+(?::\d+)?(?:/[^?\s]*)?(?:\?[^\s#]*)?(?:#[^\s]*)?'
         return re.findall(url_pattern, text)
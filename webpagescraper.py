@@ -1,58 +1,171 @@
 """ Gets the html from a web-page """
+import asyncio
+import json
 import os
 import time
-import requests
 import logging
-from urllib.parse import urlparse
+from collections import Counter
+from typing import Iterable, List, Optional
+
+from asyncfetcher import AsyncFetcher
+from metrics import metrics
+from segmentstore import SegmentStore
+from urlutils import canonicalize_url, url_hash
+
+# Page types worth keeping; anything else (images, bundles, downloads) is dropped unread.
+# Plain text covers robots.txt.
+PAGE_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain')
 
 class WebPageScraper:
-    def __init__(self, cache_folder="HTML_Cache"):
+    def __init__(self, cache_folder="HTML_Cache", max_connections=64, max_per_host=4,
+                 fresh_for=300, max_age=86400, cache_max_bytes=None, max_page_bytes=5 << 20, head_bytes=32 << 10):
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
         self.cache_folder = cache_folder
         os.makedirs(self.cache_folder, exist_ok=True)
+        # Pages live compressed in append-only segment files; cache_max_bytes caps their size
+        self.store = SegmentStore(os.path.join(cache_folder, 'segments'), max_bytes=cache_max_bytes)
+        # Cached pages are served without a request for fresh_for seconds, then
+        # revalidated with ETag/Last-Modified; pages without validators expire after max_age
+        self.fresh_for = fresh_for
+        self.max_age = max_age
+        # Pages over max_page_bytes are abandoned mid-download; head-only fetches stop after head_bytes
+        self.max_page_bytes = max_page_bytes
+        self.head_bytes = head_bytes
+        self.stats = Counter()
+        self.fetcher = AsyncFetcher(max_connections=max_connections, max_per_host=max_per_host)
+
+    def get_html(self, url: str, head_only: bool = False) -> str:
+        return self.fetcher.run(self.aget_html(url, head_only))
+
+    def get_html_many(self, urls: Iterable[str]) -> List[str]:
+        """Fetch several pages concurrently, returning their HTML in input order."""
+        return self.fetcher.run(self.aget_html_many(urls))
 
-    def get_html(self, url: str) -> str:
+    async def aget_html(self, url: str, head_only: bool = False) -> str:
+        """Return a page's HTML, or "" if it can't be fetched.
+
+        With ``head_only`` only the first ``head_bytes`` are downloaded, which is
+        enough for the title and top headings; a cached full page is returned as is.
+        """
         self.logger.info(f"Fetching HTML content for URL: {url}")
-        file_name = self._get_file_name(url)
-        file_path = os.path.join(self.cache_folder, file_name)
+        key = url_hash(url)
+        meta = self._read_meta(key)
+        if meta is not None and meta.get('partial') and not head_only:
+            # Only the start of the page is cached, so fetch the whole of it
+            meta = None
+
+        if meta is not None and self._is_cache_valid(meta):
+            cached = self._read_from_cache(key)
+            if cached is not None:
+                self._count('hit')
+                return cached
+            meta = None
+
+        return await self._fetch_and_save(url, key, meta, head_only)
+
+    async def aget_html_many(self, urls: Iterable[str]) -> List[str]:
+        return await asyncio.gather(*(self.aget_html(url) for url in urls))
 
-        if self._is_cache_valid(file_path):
-            return self._read_from_cache(file_path)
+    def run(self, coro):
+        """Run a coroutine on the scraper's event loop from synchronous code."""
+        return self.fetcher.run(coro)
 
-        return self._fetch_and_save(url, file_path)
+    def submit(self, coro):
+        """Schedule a coroutine on the scraper's event loop, returning a concurrent Future."""
+        return self.fetcher.submit(coro)
 
-    def _get_file_name(self, url: str) -> str:
-        base_name = urlparse(url).netloc.replace('www.', '') + '.html'
-        return base_name
+    def close(self):
+        self.fetcher.close()
+        self.store.close()
 
-    def _is_cache_valid(self, file_path: str) -> bool:
-        return os.path.exists(file_path) and (time.time() - os.path.getmtime(file_path) < 86400)
+    def _count(self, result: str):
+        self.stats[result] += 1
+        metrics.inc('html_cache_total', result=result)
 
-    def _read_from_cache(self, file_path: str) -> str:
-        self.logger.info(f"Reading HTML content from cache: {file_path}")
-        with open(file_path, 'r', encoding='utf-8') as file:
-            return file.read()
+    def _read_meta(self, key: str) -> Optional[dict]:
+        meta = self.store.get_meta(key)
+        if meta is None:
+            meta = self._migrate_legacy_entry(key)
+        return meta
 
-    def _fetch_and_save(self, url: str, file_path: str) -> str:
-        self.logger.info(f"Fetching fresh HTML content for URL: {url}")
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
+    def _migrate_legacy_entry(self, key: str) -> Optional[dict]:
+        """Move a page cached as its own .html file (and .json metadata) into the segment store."""
+        file_path = os.path.join(self.cache_folder, key + '.html')
+        meta_path = os.path.join(self.cache_folder, key + '.json')
         try:
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
-            content = response.text
+            with open(file_path, 'r', encoding='utf-8') as file:
+                text = file.read()
+        except OSError:
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as file:
+                meta = json.load(file)
+        except (OSError, ValueError):
+            # Entry predates metadata; treat it as having no validators
+            meta = {'fetched_at': os.path.getmtime(file_path)}
+        self.store.put(key, text, meta)
+        for path in (file_path, meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+        return meta
+
+    def _is_cache_valid(self, meta: dict) -> bool:
+        """Serve without a request while fresh; entries without validators fall back to max_age."""
+        age = time.time() - meta.get('fetched_at', 0)
+        if age < self.fresh_for:
+            return True
+        has_validators = meta.get('etag') or meta.get('last_modified')
+        return not has_validators and age < self.max_age
+
+    def _read_from_cache(self, key: str) -> Optional[str]:
+        self.logger.info(f"Reading HTML content from cache: {key}")
+        entry = self.store.get(key)
+        return entry[1] if entry is not None else None
+
+    async def _fetch_and_save(self, url: str, key: str, meta: Optional[dict] = None, head_only: bool = False) -> str:
+        headers = {}
+        if meta and meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta and meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
 
-            with open(file_path, 'w', encoding='utf-8') as file:
-                file.write(content)
-            self.logger.info(f"Saved HTML content to: {file_path}")
+        if headers:
+            self.logger.info(f"Revalidating cached HTML content for URL: {url}")
+        else:
+            self.logger.info(f"Fetching fresh HTML content for URL: {url}")
+        result = await self.fetcher.fetch(url, headers=headers or None, max_bytes=self.max_page_bytes,
+                                          partial_bytes=self.head_bytes if head_only else None,
+                                          content_types=PAGE_CONTENT_TYPES)
 
-            return content
-        except requests.RequestException as e:
-            self.logger.error(f"Failed to fetch HTML content for {url}: {str(e)}")
+        if result.status == 304 and meta is not None:
+            # Only the index records the new fetch time; the cached page isn't rewritten
+            cached = self._read_from_cache(key) if self.store.touch(key) else None
+            if cached is not None:
+                self._count('revalidated')
+                return cached
+            # The entry was evicted or lost since its metadata was read, so the 304 has nothing to serve
+            self.logger.warning(f"Cached HTML content for {url} is gone, fetching it again without validators")
+            return await self._fetch_and_save(url, key, None, head_only)
+
+        if not result.ok:
+            self._count('error')
+            reason = result.error or f"HTTP {result.status}"
+            self.logger.error(f"Failed to fetch HTML content for {url}: {reason}")
             return ""
 
+        self._count('miss')
+        self.store.put(key, result.text, {
+            'url': canonicalize_url(url),
+            'etag': result.headers.get('etag'),
+            'last_modified': result.headers.get('last-modified'),
+            'fetched_at': time.time(),
+            'partial': result.truncated,
+        })
+        self.logger.info(f"Saved HTML content to the cache: {key}")
+
+        return result.text
+
 def main():
     url = "https://www.futurlab.co.uk/careers#vacancies"
     scraper = WebPageScraper()
@@ -62,6 +175,8 @@ def main():
         scraper.logger.info("HTML content retrieval successful.")
     else:
         scraper.logger.error("Failed to retrieve HTML content.")
+    scraper.logger.info(f"Cache stats: {dict(scraper.stats)}")
+    scraper.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,224 @@
+""" Durable SQLite work queue with leases, so several processes or machines can share a crawl """
+import argparse
+import json
+import logging
+import os
+import socket
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Task:
+    id: int
+    kind: str
+    key: str
+    payload: dict = field(default_factory=dict)
+    attempts: int = 0
+
+
+def default_owner() -> str:
+    """Lease owner name for this process, unique across machines sharing a queue."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """Tasks in SQLite that workers lease, heartbeat and complete.
+
+    A leased task belongs to its owner until ``lease_seconds`` pass without a
+    heartbeat; after that any worker may lease it again, so the work of a
+    crashed process is picked up rather than lost. Failed tasks are retried
+    with exponential backoff, and a task that fails or loses its lease
+    ``max_attempts`` times is dead-lettered for inspection instead of being
+    retried forever. Tasks are unique by (kind, key), so adding one twice is
+    a no-op and the queue doubles as the run's checkpoint. Every change runs
+    in an immediate transaction, which lets processes on one machine, or on
+    machines sharing a file system with working locks, drain the same file.
+    """
+
+    def __init__(self, db_path: str = "Crawl_State/queue.db", lease_seconds: float = 300, max_attempts: int = 3,
+                 retry_delay: float = 30):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        # Transactions are explicit so a lease is read and taken atomically
+        self._db = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, key TEXT NOT NULL, payload TEXT, "
+            "priority INTEGER NOT NULL DEFAULT 0, status TEXT NOT NULL DEFAULT 'pending', "
+            "attempts INTEGER NOT NULL DEFAULT 0, owner TEXT, lease_expires REAL, available_at REAL NOT NULL, "
+            "last_error TEXT, created_at REAL, updated_at REAL, UNIQUE (kind, key))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (status, priority, available_at)")
+
+    def put(self, kind: str, key: str, payload: Optional[dict] = None, priority: int = 0) -> bool:
+        """Add a task, returning False if one with the same kind and key already exists."""
+        return self.put_many(kind, [(key, payload)], priority) == 1
+
+    def put_many(self, kind: str, tasks: Iterable[Tuple[str, Optional[dict]]], priority: int = 0) -> int:
+        """Add (key, payload) tasks of one kind, returning how many were new."""
+        with self._transaction():
+            return self._insert(kind, tasks, priority)
+
+    def lease(self, owner: str, kinds: Optional[Iterable[str]] = None) -> Optional[Task]:
+        """Take the highest priority ready task, or None if there is none right now."""
+        now = time.time()
+        kinds = list(kinds or [])
+        kind_filter = f" AND kind IN ({', '.join('?' * len(kinds))})" if kinds else ""
+        with self._transaction():
+            self._reclaim_expired(now)
+            row = self._db.execute(
+                "SELECT id, kind, key, payload, attempts FROM tasks "
+                f"WHERE status = 'pending' AND available_at <= ?{kind_filter} "
+                "ORDER BY priority DESC, id LIMIT 1",
+                [now] + kinds,
+            ).fetchone()
+            if row is None:
+                return None
+            task_id, kind, key, payload, attempts = row
+            self._db.execute(
+                "UPDATE tasks SET status = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE id = ?",
+                (owner, now + self.lease_seconds, now, task_id),
+            )
+        metrics.inc('queue_leases_total', kind=kind)
+        return Task(task_id, kind, key, json.loads(payload) if payload else {}, attempts + 1)
+
+    def heartbeat(self, task: Task, owner: str) -> bool:
+        """Extend a lease; False means it expired and may now belong to another worker."""
+        now = time.time()
+        with self._transaction():
+            cursor = self._db.execute(
+                "UPDATE tasks SET lease_expires = ?, updated_at = ? WHERE id = ? AND owner = ? AND status = 'leased'",
+                (now + self.lease_seconds, now, task.id, owner),
+            )
+        if cursor.rowcount == 0:
+            logger.warning(f"⚠️ Lost the lease on {task.kind} task {task.key}")
+            return False
+        return True
+
+    def complete(self, task: Task, owner: str, follow_ups: Iterable[Tuple[str, str, Optional[dict], int]] = ()) -> bool:
+        """Mark a task done and add the (kind, key, payload, priority) tasks it produced, atomically."""
+        now = time.time()
+        with self._transaction():
+            cursor = self._db.execute(
+                "UPDATE tasks SET status = 'done', owner = NULL, lease_expires = NULL, last_error = NULL, updated_at = ? "
+                "WHERE id = ? AND owner = ? AND status = 'leased'",
+                (now, task.id, owner),
+            )
+            if cursor.rowcount == 0:
+                logger.warning(f"⚠️ {task.kind} task {task.key} finished after its lease was lost")
+                return False
+            for kind, key, payload, priority in follow_ups:
+                self._insert(kind, [(key, payload)], priority)
+        metrics.inc('queue_tasks_total', kind=task.kind, result='done')
+        return True
+
+    def fail(self, task: Task, owner: str, error: str) -> bool:
+        """Record a failed attempt, scheduling a retry or dead-lettering the task; True if it will be retried."""
+        now = time.time()
+        retry = task.attempts < self.max_attempts
+        with self._transaction():
+            self._db.execute(
+                "UPDATE tasks SET status = ?, owner = NULL, lease_expires = NULL, available_at = ?, last_error = ?, "
+                "updated_at = ? WHERE id = ? AND owner = ? AND status = 'leased'",
+                ('pending' if retry else 'dead', now + self.retry_delay * 2 ** (task.attempts - 1), error, now,
+                 task.id, owner),
+            )
+        if retry:
+            logger.warning(f"🔁 {task.kind} task {task.key} failed (attempt {task.attempts}/{self.max_attempts}): {error}")
+        else:
+            logger.error(f"☠️ {task.kind} task {task.key} dead-lettered after {task.attempts} attempts: {error}")
+        metrics.inc('queue_tasks_total', kind=task.kind, result='retry' if retry else 'dead')
+        return retry
+
+    def unfinished(self) -> int:
+        """Tasks that are pending, leased or waiting to be retried."""
+        (count,) = self._db.execute("SELECT COUNT(*) FROM tasks WHERE status IN ('pending', 'leased')").fetchone()
+        return count
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """Number of tasks by kind and status."""
+        counts: Dict[str, Dict[str, int]] = {}
+        for kind, status, count in self._db.execute("SELECT kind, status, COUNT(*) FROM tasks GROUP BY kind, status"):
+            counts.setdefault(kind, {})[status] = count
+        return counts
+
+    def dead_letters(self) -> List[Tuple[Task, str]]:
+        rows = self._db.execute("SELECT id, kind, key, payload, attempts, last_error FROM tasks WHERE status = 'dead' ORDER BY id")
+        return [(Task(task_id, kind, key, json.loads(payload) if payload else {}, attempts), error)
+                for task_id, kind, key, payload, attempts, error in rows]
+
+    def retry_dead(self) -> int:
+        """Give every dead-lettered task a fresh set of attempts."""
+        with self._transaction():
+            cursor = self._db.execute(
+                "UPDATE tasks SET status = 'pending', attempts = 0, available_at = ?, updated_at = ? WHERE status = 'dead'",
+                (time.time(), time.time()),
+            )
+        return cursor.rowcount
+
+    def close(self):
+        self._db.close()
+
+    def _insert(self, kind: str, tasks: Iterable[Tuple[str, Optional[dict]]], priority: int) -> int:
+        now = time.time()
+        cursor = self._db.executemany(
+            "INSERT OR IGNORE INTO tasks (kind, key, payload, priority, available_at, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(kind, key, json.dumps(payload) if payload else None, priority, now, now, now) for key, payload in tasks],
+        )
+        return cursor.rowcount
+
+    def _reclaim_expired(self, now: float):
+        """Return tasks whose owner stopped heartbeating to the queue, or dead-letter them if out of attempts."""
+        cursor = self._db.execute(
+            "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'dead' ELSE 'pending' END, "
+            "owner = NULL, lease_expires = NULL, available_at = ?, last_error = 'lease expired', updated_at = ? "
+            "WHERE status = 'leased' AND lease_expires < ?",
+            (self.max_attempts, now, now, now),
+        )
+        if cursor.rowcount:
+            logger.warning(f"⏰ Reclaimed {cursor.rowcount} tasks whose lease expired")
+            metrics.inc('queue_leases_expired_total', cursor.rowcount)
+
+    @contextmanager
+    def _transaction(self):
+        # IMMEDIATE takes the write lock up front, so two workers can't lease the same task
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a crawl work queue")
+    parser.add_argument("db_path", nargs="?", default="Crawl_State/queue.db", help="Work queue database")
+    parser.add_argument("command", choices=['stats', 'dead', 'retry-dead'], help="What to do")
+    args = parser.parse_args()
+
+    work_queue = WorkQueue(args.db_path)
+    if args.command == 'dead':
+        for task, error in work_queue.dead_letters():
+            print(f"{task.kind}\t{task.key}\t{task.attempts} attempts\t{error}")
+    elif args.command == 'retry-dead':
+        print(f"Requeued {work_queue.retry_dead()} dead-lettered tasks")
+    print(json.dumps(work_queue.counts(), indent=2))
+    work_queue.close()
+
+
+if __name__ == "__main__":
+    main()